@@ -0,0 +1,128 @@
+"""
+Audio modes: wall time per track for MP3 transcoding vs. the original stream.
+
+Generates test tracks with the bundled ffmpeg in the two native formats
+sites usually serve (AAC in .m4a, Opus in .webm), serves them from a local
+HTTP server and downloads them with the headless CLI once per mode:
+
+  mp3        -a                          (decode + libmp3lame encode)
+  original   -a --audio-format original  (kept as-is, or remuxed to .opus)
+
+Each run gets a fresh HOME, so no cached extraction favours one mode.
+A track's time runs from its "started" to its "done" event. Run from the
+repository root:
+
+    python benchmarks/bench_audio_modes.py [--tracks 4] [--seconds 180]
+"""
+
+import argparse
+import functools
+import http.server
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+import imageio_ffmpeg
+
+ROOT   = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENGINE = os.path.join(ROOT, "novastream_engine.py")
+
+SOURCES = {
+    "m4a":  ["-c:a", "aac", "-b:a", "128k"],
+    "webm": ["-c:a", "libopus", "-b:a", "128k"],
+}
+MODES = {
+    "mp3":      ["-a"],
+    "original": ["-a", "--audio-format", "original"],
+}
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class QuietServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass                                     # clients hang up after probing
+
+
+def serve(root: str) -> QuietServer:
+    srv = QuietServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=root))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def make_tracks(root: str, ext: str, n: int, seconds: int) -> list:
+    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+    names  = []
+    for i in range(n):
+        name = f"{ext}_track{i}.{ext}"
+        subprocess.run([ffmpeg, "-loglevel", "error", "-y", "-f", "lavfi",
+                        "-i", f"sine=frequency={220 * (i + 1)}:duration={seconds}",
+                        "-ac", "2", *SOURCES[ext], os.path.join(root, name)], check=True)
+        names.append(name)
+    return names
+
+
+def run(mode: str, urls: list, tmp: str) -> dict:
+    home = tempfile.mkdtemp(dir=tmp)
+    out  = os.path.join(home, "out")
+    env  = dict(os.environ, HOME=home, USERPROFILE=home)
+    res  = subprocess.run([sys.executable, ENGINE, "--headless", *MODES[mode], "-j", "1",
+                           "--interval", "3600", "-o", out, *urls],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    started, times = {}, []
+    for line in res.stdout.splitlines():
+        rec = json.loads(line)
+        if rec["event"] == "started":
+            started[rec["job"]] = rec["ts"]
+        elif rec["event"] == "done":
+            times.append(rec["ts"] - started[rec["job"]])
+        elif rec["event"] == "error":
+            raise RuntimeError(f"{mode}: {rec.get('error')}")
+    times.sort()
+    files = os.listdir(out) if os.path.isdir(out) else []
+    return {
+        "tracks":     len(times),
+        "mean_s":     round(sum(times) / len(times), 3) if times else None,
+        "p50_s":      round(times[len(times) // 2], 3) if times else None,
+        "out_ext":    sorted({os.path.splitext(f)[1] for f in files}),
+        "out_bytes":  sum(os.path.getsize(os.path.join(out, f)) for f in files),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--tracks", type=int, default=4)
+    ap.add_argument("--seconds", type=int, default=180, help="length of each track")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = os.path.join(tmp, "media")
+        os.mkdir(media)
+        srv = serve(media)
+        results = []
+        for ext in SOURCES:
+            names = make_tracks(media, ext, args.tracks, args.seconds)
+            urls  = [f"http://127.0.0.1:{srv.server_port}/{n}" for n in names]
+            for mode in MODES:
+                results.append(dict({"source": ext, "mode": mode}, **run(mode, urls, tmp)))
+        srv.shutdown()
+
+    speedup = {}
+    for ext in SOURCES:
+        mp3, orig = (next(r["mean_s"] for r in results
+                          if r["source"] == ext and r["mode"] == m) for m in MODES)
+        speedup[ext] = round(mp3 / orig, 2) if orig else None
+    print(json.dumps({"seconds_per_track": args.seconds, "results": results,
+                      "original_speedup": speedup}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Format selection: bytes transferred per policy vs. the old format strings.
+
+Runs novastream_formats.select over the format lists of
+tests/format_fixtures.py, shaped like real extractor output (a DASH site
+with separate avc1/vp9/av01 video and m4a/opus audio plus one muxed 360p
+file, and a site serving only progressive mp4 renditions). For every
+quality it prints the chosen format ids and their bytes for each policy,
+next to what yt-dlp picks for the format string the app used before. No
+network. Run from the repository root:
+
+    python benchmarks/bench_format_policy.py
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp                                    # noqa: E402
+from novastream_engine import QUALITY_CHOICES    # noqa: E402
+from novastream_formats import POLICIES, select  # noqa: E402
+from tests.format_fixtures import DASH, MB, PROGRESSIVE   # noqa: E402
+
+def old_spec(q: str) -> str:
+    if q == "best":
+        return "bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo[ext=mp4]+bestaudio/bestvideo+bestaudio/best"
+    return (f"bestvideo[height<={q}][ext=mp4]+bestaudio[ext=m4a]"
+            f"/bestvideo[height<={q}][ext=mp4]+bestaudio/bestvideo[height<={q}]+bestaudio/best")
+
+
+def summary(fmts: list) -> dict:
+    return {"ids": "+".join(f["format_id"] for f in fmts),
+            "mb":  round(sum(f["filesize"] for f in fmts) / MB, 1),
+            "merge": len(fmts) > 1}
+
+
+def main():
+    ydl = yt_dlp.YoutubeDL({"quiet": True})
+    report = {}
+    for name, formats in (("dash", DASH), ("progressive", PROGRESSIVE)):
+        rows = {}
+        for q in QUALITY_CHOICES:
+            ctx = {"formats": formats, "has_merged_format": True, "incomplete_formats": False}
+            old = next(iter(ydl.build_format_selector(old_spec(q))(ctx)), {})
+            row = {"old_string": summary(old.get("requested_formats") or [old])}
+            for policy in POLICIES:
+                row[policy] = summary(select(formats, q, policy))
+            rows[q] = row
+        report[name] = rows
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Startup cost: time-to-first-frame and time-to-ready of novastream_pro_v2.
+
+Each measurement runs in a fresh interpreter (with HOME pointed at a temp
+folder, so no settings or resume prompt get in the way):
+
+  eager_imports    import customtkinter + yt_dlp + imageio_ffmpeg up front,
+                   i.e. what the module paid before the window could appear
+  app              import the module, build the window and draw it
+                   (first_frame_s), then wait for the background warm-up
+                   (ready_s)
+
+Without a display only the import and warm-up timings are reported.
+Run from the repository root:
+
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER = r"""
+import json, time
+t0 = time.perf_counter()
+import customtkinter, yt_dlp, imageio_ffmpeg
+yt_dlp.extractor.gen_extractor_classes()
+print(json.dumps({"ready_s": time.perf_counter() - t0}))
+"""
+
+APP = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+import novastream_pro_v2 as m
+out = {"import_s": time.perf_counter() - t0}
+if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+    import novastream_engine
+    novastream_engine.warm_up()
+    out["ready_s"] = time.perf_counter() - t0
+else:
+    app = m.NovaStreamPro()
+    app.update()
+    out["first_frame_s"] = time.perf_counter() - t0
+    while not m.ENGINE_READY.wait(0.005):
+        app.update()
+    out["ready_s"] = time.perf_counter() - t0
+    app.on_closing()
+print(json.dumps(out))
+"""
+
+
+def measure(code: str, home: str) -> dict:
+    env = dict(os.environ, HOME=home, USERPROFILE=home)
+    res = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples: list) -> dict:
+    keys = samples[0].keys()
+    return {k: round(sorted(s[k] for s in samples)[len(samples) // 2], 4) for k in keys}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        eager = [measure(EAGER, home) for _ in range(args.runs)]
+        app   = [measure(APP, home) for _ in range(args.runs)]
+    print(json.dumps({"runs": args.runs, "median": {
+        "eager_imports": summarize(eager),
+        "app":           summarize(app),
+    }}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Download-path benchmarks against a local media server, as one JSON report.
+
+Starts benchmarks/media_server.py in-process and drives a real
+DownloadEngine headlessly (yt-dlp extraction, segmented HTTP, HLS
+fragments, post-processing, events), then measures:
+
+  throughput     MiB/s of one progressive file over 1 and N connections,
+                 the same with Range support off, and an HLS playlist
+                 fetched N fragments at a time, all at --rate per connection;
+                 a job's time runs from its "started" to its "done" event
+  job_overhead   wall time per job for many tiny files: extraction,
+                 YoutubeDL setup and bookkeeping with next to no transfer
+  progress_hook  cost of one DownloadEngine._progress_hook call, the
+                 callback yt-dlp makes for every block it reads
+  ui_tick        lateness of the window's progress tick and the wave's
+                 frame times while a download runs (needs a display)
+
+HOME points at a temp folder for the whole run, so settings, the archive
+and the info cache of the user are never touched. Save a report per commit
+and compare two of them:
+
+    python benchmarks/bench_suite.py [--size 32] [--rate 4M] --out before.json
+    python benchmarks/bench_suite.py --out after.json --compare before.json
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+HOME = tempfile.mkdtemp(prefix="novastream-bench-")
+os.environ["HOME"] = os.environ["USERPROFILE"] = HOME   # before the engine reads ~
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import argparse                                   # noqa: E402
+import json                                       # noqa: E402
+import platform                                   # noqa: E402
+import subprocess                                 # noqa: E402
+import threading                                  # noqa: E402
+import time                                       # noqa: E402
+
+from media_server import MediaServer              # noqa: E402
+from novastream_engine import (                   # noqa: E402
+    DEFAULT_SETTINGS, DownloadEngine, DownloadJob, parse_rate,
+)
+
+MB = 1024 * 1024
+
+
+class Recorder:
+    """Engine listener: event times per job, and a wait for the batch to end."""
+
+    def __init__(self):
+        self.times  = {}             # job id → {event: time.monotonic()}
+        self.errors = []
+        self._cond  = threading.Condition()
+
+    def __call__(self, event, job, info):
+        if job is None:
+            return
+        with self._cond:
+            self.times.setdefault(job.id, {})[event] = time.monotonic()
+            if event == "error":
+                self.errors.append(f"{job.url}: {info.get('error')}")
+            self._cond.notify_all()
+
+    def wait(self, jobs: list, timeout: float = 600):
+        end = lambda: all({"done", "error", "cancelled"} & set(self.times.get(j.id, {}))
+                          for j in jobs)
+        with self._cond:
+            if not self._cond.wait_for(end, timeout):
+                raise TimeoutError("jobs did not finish")
+        if self.errors:
+            raise RuntimeError(self.errors[0])
+
+
+def run_jobs(engine, rec: Recorder, urls: list, out_dir: str) -> list:
+    jobs = [DownloadJob(url, False, "best", [], out_dir) for url in urls]
+    for job in jobs:
+        engine.submit(job)
+    rec.wait(jobs)
+    return jobs
+
+
+def dir_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+# ── Scenarios ─────────────────────────────────────────────────────────────────
+def bench_throughput(engine, rec, args) -> dict:
+    size, conns = args.size * MB, args.connections
+    fast = MediaServer(args.rate).start()
+    flat = MediaServer(args.rate, ranges=False).start()
+    cases = [
+        ("progressive_1conn",           fast, "file", 1),
+        (f"progressive_{conns}conn",    fast, "file", conns),
+        (f"progressive_noranges_{conns}conn", flat, "file", conns),
+        (f"hls_{conns}frag",            fast, "hls", conns),
+    ]
+    report = {}
+    for name, srv, kind, n in cases:
+        url = srv.add_file(name, size) if kind == "file" else srv.add_hls(name, size)
+        out = os.path.join(HOME, name)
+        engine.settings["connections"] = n
+        t0   = time.monotonic()
+        job, = run_jobs(engine, rec, [url], out)
+        t    = rec.times[job.id]
+        secs = t["done"] - t["started"]
+        report[name] = {"connections": n, "bytes": dir_bytes(out), "seconds": round(secs, 3),
+                        "mib_s": round(dir_bytes(out) / MB / secs, 2),
+                        "wall_s": round(time.monotonic() - t0, 3)}
+    for srv in (fast, flat):
+        srv.shutdown()
+    engine.settings["connections"] = DEFAULT_SETTINGS["connections"]
+    return report
+
+
+def bench_job_overhead(engine, rec, args) -> dict:
+    srv  = MediaServer().start()
+    urls = [srv.add_file(f"tiny{i}", 4096) for i in range(args.jobs)]
+    t0   = time.monotonic()
+    jobs = run_jobs(engine, rec, urls, os.path.join(HOME, "tiny"))
+    wall = time.monotonic() - t0
+    srv.shutdown()
+    per  = sorted(rec.times[j.id]["done"] - rec.times[j.id]["started"] for j in jobs)
+    return {"jobs": len(jobs), "wall_s": round(wall, 3),
+            "mean_ms": round(sum(per) / len(per) * 1000, 2),
+            "p50_ms": round(per[len(per) // 2] * 1000, 2),
+            "max_ms": round(per[-1] * 1000, 2)}
+
+
+def bench_progress_hook(engine, args) -> dict:
+    job   = DownloadJob("http://127.0.0.1/hook.mp4", False, "best", [], HOME)
+    total = args.calls * 65536
+    info  = {"title": "hook", "id": "hook"}
+    calls = [{"status": "downloading", "downloaded_bytes": i * 65536, "total_bytes": total,
+              "speed": 8e6, "tmpfilename": "hook.mp4.part", "filename": "hook.mp4",
+              "info_dict": info} for i in range(args.calls)]
+    hook  = engine._progress_hook
+    t0    = time.perf_counter()
+    for d in calls:
+        hook(job, d)
+    secs  = time.perf_counter() - t0
+    engine.progress.drain()
+    return {"calls": args.calls, "us_per_call": round(secs / args.calls * 1e6, 3)}
+
+
+def bench_ui_tick(args) -> dict:
+    """The real window with one throttled download running through it."""
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        return {"skipped": "no display"}
+    import novastream_pro_v2 as gui
+
+    srv  = MediaServer(args.rate).start()
+    url  = srv.add_file("ui", args.size * MB)
+    app  = gui.NovaStreamPro()
+    nominal = 1000 // gui.PROGRESS_HZ
+    gaps, last = [], [None]
+    tick = app._progress_tick
+
+    def timed_tick():
+        now = time.perf_counter()
+        if last[0] is not None:
+            gaps.append((now - last[0]) * 1000 - nominal)
+        last[0] = now
+        tick()
+    app._progress_tick = timed_tick
+
+    rec = Recorder()
+    app.engine.add_listener(rec)
+    while not gui.ENGINE_READY.wait(0.005):
+        app.update()
+    job = DownloadJob(url, False, "best", [], os.path.join(HOME, "ui"))
+    app.after(0, app.engine.submit, job)
+    while not {"done", "error"} & set(rec.times.get(job.id, {})):
+        app.update()
+        time.sleep(0.001)
+    stats = app.wave_stats()
+    app.on_closing()
+    srv.shutdown()
+    gaps.sort()
+    return {"ticks": len(gaps), "nominal_ms": nominal,
+            "late_mean_ms": round(sum(gaps) / len(gaps), 2) if gaps else None,
+            "late_p95_ms": round(gaps[int(len(gaps) * 0.95)], 2) if gaps else None,
+            "late_max_ms": round(gaps[-1], 2) if gaps else None,
+            "wave": stats}
+
+
+# ── Report ────────────────────────────────────────────────────────────────────
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def flatten(d: dict, prefix: str = "") -> dict:
+    out = {}
+    for k, v in d.items():
+        if isinstance(v, dict):
+            out.update(flatten(v, f"{prefix}{k}."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[prefix + k] = v
+    return out
+
+
+def compare(old: dict, new: dict) -> dict:
+    """Every numeric result in both reports: old, new and the change in %."""
+    a, b = flatten(old["results"]), flatten(new["results"])
+    return {k: {"old": a[k], "new": b[k],
+                "change_pct": round((b[k] - a[k]) / a[k] * 100, 1) if a[k] else None}
+            for k in a if k in b and a[k] != b[k]}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--size", type=int, default=32, help="MiB per throughput download")
+    ap.add_argument("--rate", type=parse_rate, default=parse_rate("4M"),
+                    help="server bandwidth per connection, e.g. 4M (0 = unthrottled)")
+    ap.add_argument("--connections", type=int, default=4, choices=(2, 4, 8, 16))
+    ap.add_argument("--jobs", type=int, default=30, help="tiny jobs for job_overhead")
+    ap.add_argument("--calls", type=int, default=20000, help="progress hook calls")
+    ap.add_argument("--out", help="also write the report to this file")
+    ap.add_argument("--compare", metavar="REPORT", help="an earlier report to diff against")
+    args = ap.parse_args()
+
+    try:
+        rec    = Recorder()
+        engine = DownloadEngine(dict(DEFAULT_SETTINGS, skip_archived=False), rec, workers=1)
+        if not engine.start():
+            sys.exit("engine failed to start")
+        results = {
+            "throughput":    bench_throughput(engine, rec, args),
+            "job_overhead":  bench_job_overhead(engine, rec, args),
+            "progress_hook": bench_progress_hook(engine, args),
+            "ui_tick":       bench_ui_tick(args),
+        }
+        engine.close()
+    finally:
+        shutil.rmtree(HOME, ignore_errors=True)
+
+    report = {
+        "commit":   git_commit(),
+        "time":     time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python":   platform.python_version(),
+        "platform": platform.platform(),
+        "cpus":     os.cpu_count(),
+        "config":   {k: getattr(args, k) for k in ("size", "rate", "connections", "jobs", "calls")},
+        "results":  results,
+    }
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        report["compare"] = {"against": old.get("commit"), "results": compare(old, report)}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
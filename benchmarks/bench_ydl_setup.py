@@ -0,0 +1,98 @@
+"""
+Per-job YoutubeDL setup cost: a fresh instance per job vs. the worker pool.
+
+Serves a small file from a local HTTP server and, for each strategy, times
+N "jobs" of (get a YoutubeDL → extract_info on the local URL). Run from the
+repository root:
+
+    python benchmarks/bench_ydl_setup.py [--jobs 50]
+"""
+
+import argparse
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp                                   # noqa: E402
+from novastream_engine import YdlPool, warm_up  # noqa: E402
+
+OPTS = {"quiet": True, "no_warnings": True, "skip_download": True}
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class QuietServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass                                     # clients hang up after probing
+
+
+def serve(root: str) -> QuietServer:
+    handler = lambda *a, **kw: QuietHandler(*a, directory=root, **kw)
+    srv = QuietServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def fresh(url: str):
+    with yt_dlp.YoutubeDL(dict(OPTS, progress_hooks=[lambda d: None])) as ydl:
+        ydl.extract_info(url, download=False, process=False)
+
+
+def pooled(pool: YdlPool, url: str):
+    pool.acquire(OPTS).extract_info(url, download=False, process=False)
+
+
+def run(label: str, fn, jobs: int) -> dict:
+    fn()                                         # warm imports and regexes
+    times = []
+    for _ in range(jobs):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return {
+        "strategy": label,
+        "jobs":     jobs,
+        "mean_ms":  round(1000 * sum(times) / jobs, 3),
+        "p50_ms":   round(1000 * times[jobs // 2], 3),
+        "p95_ms":   round(1000 * times[min(jobs - 1, int(jobs * 0.95))], 3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--jobs", type=int, default=50)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        with open(os.path.join(root, "clip.mp4"), "wb") as f:
+            f.write(os.urandom(256 * 1024))
+        srv = serve(root)
+        url = f"http://127.0.0.1:{srv.server_port}/clip.mp4"
+        warm_up()
+        pool = YdlPool(lambda job, d: None)
+        results = [
+            run("fresh_instance", lambda: fresh(url), args.jobs),
+            run("worker_pool",    lambda: pooled(pool, url), args.jobs),
+        ]
+        srv.shutdown()
+
+    before, after = results[0]["mean_ms"], results[1]["mean_ms"]
+    print(json.dumps({"results": results,
+                      "speedup": round(before / after, 2) if after else None},
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Local stand-in for a media site, for the benchmarks.
+
+Serves synthetic media from memory over HTTP on 127.0.0.1:
+
+  /<name>.mp4                  a progressive file of random bytes
+  /<name>/<name>.m3u8          an HLS media playlist and its fMP4 fragments
+
+Every connection is throttled to ``rate`` bytes/s (0 = as fast as the
+loopback goes), and Range requests are honoured unless ``ranges`` is off,
+so single-stream, segmented and fragment downloads can be compared under
+the same conditions. Usable on its own as well:
+
+    python benchmarks/media_server.py --port 8000 --rate 2M --file clip:64 --hls live:64
+"""
+
+import argparse
+import http.server
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import imageio_ffmpeg
+
+CHUNK    = 64 * 1024
+HLS_RATE = 1280 * 1024      # bytes per second of HLS media, roughly
+
+
+class MediaHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"    # keep-alive, like a CDN
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(body=False)
+
+    def do_GET(self):
+        self._serve(body=True)
+
+    def _serve(self, body: bool):
+        path  = self.path.split("?")[0]
+        entry = self.server.media.get(path)
+        if entry is None:
+            self.send_error(404)
+            return
+        data, ctype = entry
+        start, end, status = 0, len(data) - 1, 200
+        m = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range") or "")
+        self.server.requests.append((self.command, path, self.headers.get("Range")))
+        if m and self.server.ranges and (m.group(1) or m.group(2)):
+            if m.group(1):
+                start = int(m.group(1))
+                end   = min(int(m.group(2) or end), end)
+            else:                    # suffix range: the last N bytes
+                start = max(0, len(data) - int(m.group(2)))
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(end - start + 1))
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+        if body:
+            self._send(data, start, end + 1)
+
+    def _send(self, data, pos: int, stop: int):
+        rate, t0, sent = self.server.rate, time.monotonic(), 0
+        try:
+            while pos < stop:
+                n = min(CHUNK, stop - pos)
+                self.wfile.write(data[pos:pos + n])
+                pos  += n
+                sent += n
+                if rate:
+                    ahead = sent / rate - (time.monotonic() - t0)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class MediaServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, rate: int = 0, ranges: bool = True, port: int = 0):
+        super().__init__(("127.0.0.1", port), MediaHandler)
+        self.rate     = rate
+        self.ranges   = ranges
+        self.media    = {}           # path → (bytes-like, content type)
+        self.requests = []           # (method, path, Range header) of every request
+
+    def handle_error(self, request, client_address):
+        pass                         # clients hang up after probing
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+    def add_file(self, name: str, size: int) -> str:
+        """A progressive .mp4 of ``size`` random bytes; returns its URL."""
+        path = f"/{name}.mp4"
+        self.media[path] = (os.urandom(size), "video/mp4")
+        return self.url(path)
+
+    def add_hls(self, name: str, size: int, segment: float = 1.0) -> str:
+        """An HLS playlist of about ``size`` bytes in ``segment``-second
+        fragments; returns the playlist URL.
+
+        The fragments are real fMP4 from the bundled ffmpeg (a noisy test
+        pattern, which keeps the encoder fast and the bitrate high), so the
+        checks yt-dlp runs after the download see valid media.
+        """
+        ffmpeg  = imageio_ffmpeg.get_ffmpeg_exe()
+        seconds = max(2 * segment, size / HLS_RATE)
+        with tempfile.TemporaryDirectory() as tmp:
+            subprocess.run([ffmpeg, "-loglevel", "error", "-f", "lavfi",
+                            "-i", f"testsrc=size=320x240:rate=10:duration={seconds:.1f}",
+                            "-vf", "noise=alls=100:allf=t", "-c:v", "mpeg4", "-q:v", "2",
+                            "-g", "10", "-f", "hls", "-hls_time", str(segment),
+                            "-hls_list_size", "0", "-hls_segment_type", "fmp4",
+                            "-hls_segment_filename", os.path.join(tmp, "%d.m4s"),
+                            os.path.join(tmp, f"{name}.m3u8")], check=True)
+            for fn in os.listdir(tmp):
+                ctype = "application/vnd.apple.mpegurl" if fn.endswith(".m3u8") else "video/mp4"
+                with open(os.path.join(tmp, fn), "rb") as f:
+                    self.media[f"/{name}/{fn}"] = (f.read(), ctype)
+        return self.url(f"/{name}/{name}.m3u8")
+
+    def start(self) -> "MediaServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from novastream_engine import parse_rate
+
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--rate", type=parse_rate, default=0, help="per connection, e.g. 2M")
+    ap.add_argument("--no-ranges", action="store_true")
+    ap.add_argument("--file", action="append", default=[], metavar="NAME:MIB")
+    ap.add_argument("--hls", action="append", default=[], metavar="NAME:MIB")
+    args = ap.parse_args()
+
+    srv = MediaServer(args.rate, not args.no_ranges, args.port)
+    for spec in args.file:
+        name, mib = spec.split(":")
+        print(srv.add_file(name, int(mib) << 20))
+    for spec in args.hls:
+        name, mib = spec.split(":")
+        print(srv.add_hls(name, int(mib) << 20))
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
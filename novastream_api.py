@@ -0,0 +1,346 @@
+"""
+NovaStream Pro - local job API
+Author : Rizinkovic
+
+A small HTTP/JSON server on asyncio (standard library only) that feeds the
+same DownloadEngine as the window or the headless CLI:
+
+    GET    /jobs           every job of this session
+    POST   /jobs           {"url": ... | "urls": [...], "audio", "audio_format",
+                            "quality", "subs": ["en"], "batch", "priority"}
+                                                   →  201 + the new jobs
+    GET    /jobs/<id>      one job
+    PATCH  /jobs/<id>      {"priority": "high" | "normal" | "background"}
+    DELETE /jobs/<id>      cancel it
+    GET    /events         Server-Sent Events: engine events and progress
+
+It listens on localhost unless ``api_host`` says otherwise. When
+``api_token`` is set, every request needs ``Authorization: Bearer <token>``.
+A non-local bind always gets a token. Files always go to the front-end's
+download folder: clients cannot choose paths.
+
+Without a token, a web page open in the user's browser can still reach a
+loopback port, so requests that look like they come from one are refused:
+any ``Origin`` header, a ``Host`` that is not a loopback name (DNS
+rebinding), and bodies that are not ``application/json`` (browsers send
+text/plain and form posts cross-origin without a CORS preflight).
+"""
+
+import asyncio
+import hmac
+import ipaddress
+import json
+import secrets
+import threading
+from urllib.parse import urlparse
+
+from novastream_engine import (
+    QUALITY_CHOICES, AUDIO_FORMATS, PRIORITIES, DownloadJob, event_record, sanitize_url, sanitize_path,
+)
+
+MAX_BODY     = 64 * 1024
+MAX_URLS     = 500         # per POST
+SSE_BACKLOG  = 1000        # events buffered per slow client before dropping
+SSE_PING     = 15          # seconds between keep-alive comments
+PROGRESS_INTERVAL = 0.5    # seconds between progress events per running job
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized",
+           403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+           413: "Payload Too Large", 415: "Unsupported Media Type",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def host_name(header: str) -> str:
+    """The host of a Host header, without port or IPv6 brackets."""
+    if header.startswith("["):
+        return header[1:].split("]", 1)[0]
+    return header.rsplit(":", 1)[0] if header.count(":") == 1 else header
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class ApiServer:
+    """The job API, running its own event loop on a daemon thread.
+
+    ``out_dir`` is called for every submission, so the GUI's folder
+    choice applies to remote jobs too.
+    """
+
+    def __init__(self, engine, host: str, port: int, token: str, out_dir):
+        self.engine  = engine
+        self.host    = host
+        self.port    = port
+        self.token   = token
+        self.out_dir = out_dir
+        self.new_token = False       # set by start_api() when it made the token
+        self._loop   = None
+        self._server = None
+        self._thread = None
+        self._subs   = set()         # one asyncio.Queue per /events client
+        self._sent   = {}            # job id → last progress sent
+        self._ready  = threading.Event()
+        self._error  = None
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+    def start(self):
+        """Bind and serve in the background; raises OSError if the bind fails."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        self.engine.add_listener(self._on_event)
+
+    def stop(self, timeout: float = 5):
+        """Close the listening socket and every connection; once this
+        returns the port can be bound again."""
+        self.engine.remove_listener(self._on_event)
+        if self._thread is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+
+    def _run(self):
+        loop = self._loop = asyncio.new_event_loop()
+        try:
+            self._server = loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port))
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            loop.close()
+            return
+        self.port = self._server.sockets[0].getsockname()[1]   # when 0 was asked
+        self._ready.set()
+        loop.create_task(self._progress_loop())
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(self._server.wait_closed())
+            loop.close()
+
+    # ── Events ────────────────────────────────────────────────────────────────
+    def _on_event(self, event: str, job, info: dict):
+        """Engine listener (worker threads): hand the event to the loop."""
+        if self._subs:
+            rec = event_record(event, job, info)
+            self._loop.call_soon_threadsafe(self._broadcast, rec)
+
+    def _broadcast(self, rec: dict):
+        for q in list(self._subs):
+            try:
+                q.put_nowait(rec)
+            except asyncio.QueueFull:
+                pass                 # a stalled client misses events, not memory
+
+    async def _progress_loop(self):
+        """Progress of running jobs, sent only when it changed."""
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            if not self._subs:
+                continue
+            for job in self.engine.snapshot():
+                if job.state != "running":
+                    self._sent.pop(job.id, None)
+                    continue
+                prog = job.progress()
+                if self._sent.get(job.id) != prog:
+                    self._sent[job.id] = prog
+                    self._broadcast(event_record("progress", job, prog))
+
+    # ── HTTP ──────────────────────────────────────────────────────────────────
+    async def _handle(self, reader, writer):
+        try:
+            method, path, headers, body = await self._read_request(reader)
+            self._check_origin(headers, body)
+            if self.token and not hmac.compare_digest(
+                    headers.get("authorization", ""), f"Bearer {self.token}"):
+                raise ApiError(401, "missing or wrong token")
+            if path == "/events":
+                if method != "GET":
+                    raise ApiError(405, "GET only")
+                await self._stream_events(writer)
+                return
+            status, payload = self._route(method, path, body)
+        except ApiError as e:
+            status, payload = e.status, {"error": str(e)}
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                asyncio.TimeoutError, ConnectionError, ValueError):
+            writer.close()           # not HTTP, or the client went away
+            return
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        await self._send(writer, status, payload)
+
+    def _check_origin(self, headers: dict, body: bytes):
+        """Refuse what a browser page could send; see the module docstring."""
+        if "origin" in headers:
+            raise ApiError(403, "browser requests are not accepted")
+        if is_loopback(self.host) and not is_loopback(host_name(headers.get("host", ""))):
+            raise ApiError(403, "Host must be a loopback address")
+        ctype = headers.get("content-type", "").split(";")[0].strip().lower()
+        if body and ctype != "application/json":
+            raise ApiError(415, "Content-Type must be application/json")
+
+    @staticmethod
+    async def _read_request(reader):
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY:
+            raise ApiError(413, f"body over {MAX_BODY} bytes")
+        body = await asyncio.wait_for(reader.readexactly(length), 10) if length else b""
+        return method.upper(), urlparse(target).path.rstrip("/") or "/", headers, body
+
+    @staticmethod
+    async def _send(writer, status: int, payload):
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _stream_events(self, writer):
+        q = asyncio.Queue(maxsize=SSE_BACKLOG)
+        self._subs.add(q)            # before the client can see the stream open
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\n"
+                     b"Connection: close\r\n\r\n")
+        try:
+            while True:
+                try:
+                    rec = await asyncio.wait_for(q.get(), SSE_PING)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                else:
+                    data = json.dumps(rec, ensure_ascii=False, default=str)
+                    writer.write(f"event: {rec['event']}\ndata: {data}\n\n".encode("utf-8"))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._subs.discard(q)
+            writer.close()
+
+    # ── Routes ────────────────────────────────────────────────────────────────
+    def _route(self, method: str, path: str, body: bytes):
+        parts = path.strip("/").split("/")
+        if parts[0] != "jobs" or len(parts) > 2:
+            raise ApiError(404, "no such endpoint")
+        if len(parts) == 1:
+            if method == "GET":
+                return 200, [job.as_dict() for job in self.engine.snapshot()]
+            if method == "POST":
+                return 201, [job.as_dict() for job in self._submit(body)]
+            raise ApiError(405, "GET or POST")
+
+        try:
+            job = self.engine.jobs[int(parts[1])]
+        except (ValueError, KeyError):
+            raise ApiError(404, "no such job")
+        if method == "GET":
+            return 200, job.as_dict()
+        if method == "PATCH":
+            req = self._json(body)
+            if not self.engine.set_priority(job.id, req.get("priority")):
+                raise ApiError(400, f"priority must be one of {PRIORITIES}")
+            return 200, job.as_dict()
+        if method == "DELETE":
+            if not self.engine.cancel(job.id):
+                raise ApiError(409, f"job is {job.state}")
+            return 200, job.as_dict()
+        raise ApiError(405, "GET, PATCH or DELETE")
+
+    @staticmethod
+    def _json(body: bytes) -> dict:
+        try:
+            req = json.loads(body or b"{}")
+        except ValueError:
+            raise ApiError(400, "body is not JSON")
+        if not isinstance(req, dict):
+            raise ApiError(400, "body must be a JSON object")
+        return req
+
+    def _submit(self, body: bytes) -> list:
+        """Validate a POST /jobs body and queue its URLs, all or none."""
+        req = self._json(body)
+        raw = req.get("urls") or ([req["url"]] if req.get("url") else [])
+        if not isinstance(raw, list) or not raw:
+            raise ApiError(400, "give url or urls")
+        if len(raw) > MAX_URLS:
+            raise ApiError(400, f"at most {MAX_URLS} urls per request")
+        urls = [sanitize_url(r) if isinstance(r, str) else None for r in raw]
+        if None in urls:
+            raise ApiError(400, f"invalid or unsafe URL: {raw[urls.index(None)]!r}")
+        quality = str(req.get("quality", "best")).rstrip("p")
+        if quality not in QUALITY_CHOICES:
+            raise ApiError(400, f"quality must be one of {QUALITY_CHOICES}")
+        audio_format = req.get("audio_format", "mp3")
+        if audio_format not in AUDIO_FORMATS:
+            raise ApiError(400, f"audio_format must be one of {AUDIO_FORMATS}")
+        langs = req.get("subs") or []
+        if not isinstance(langs, list) or not all(
+                isinstance(lc, str) and lc.isalpha() and len(lc) <= 8 for lc in langs):
+            raise ApiError(400, "subs must be a list of language codes")
+        priority = req.get("priority", "normal")
+        if priority not in PRIORITIES:
+            raise ApiError(400, f"priority must be one of {PRIORITIES}")
+        try:
+            out_dir = sanitize_path(self.out_dir())
+        except ValueError:
+            raise ApiError(503, "download folder unavailable")
+        expand  = bool(req.get("batch", self.engine.settings["batch_mode"]))
+
+        jobs = [DownloadJob(url, bool(req.get("audio")), quality, langs, out_dir,
+                            expand=expand, priority=priority, audio_format=audio_format)
+                for url in dict.fromkeys(urls)]
+        for job in jobs:
+            self.engine.submit(job)
+        return jobs
+
+
+def start_api(engine, out_dir) -> ApiServer:
+    """Start the API from the engine's settings; raises OSError if it cannot bind.
+
+    A non-loopback host without a token gets a fresh one, saved to settings;
+    ``new_token`` tells the front-end to show it, as clients need it.
+    """
+    s = engine.settings
+    new = not s["api_token"] and not is_loopback(s["api_host"])
+    if new:
+        s["api_token"] = secrets.token_urlsafe(24)
+        engine.save_settings()
+    api = ApiServer(engine, s["api_host"], s["api_port"], s["api_token"], out_dir)
+    api.new_token = new
+    api.start()
+    return api
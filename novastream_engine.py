@@ -0,0 +1,1805 @@
+"""
+NovaStream Pro - download engine
+Author : Rizinkovic
+
+Everything that downloads, without Tk: job queue, workers, caches, journal
+and the progress model. The GUI (novastream_pro_v2) and the headless CLI
+below are two front-ends over the same DownloadEngine.
+
+    python novastream_engine.py --headless URL [URL ...] [-f urls.txt]
+"""
+
+import threading
+import itertools
+import queue
+import collections
+import os
+import sys
+import re
+import subprocess
+import json
+import hashlib
+import shutil
+import uuid
+import math
+import time
+import logging
+import logging.handlers
+import argparse
+import signal
+from urllib.parse import urlparse
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+from novastream_formats import POLICIES, FormatPolicy
+from novastream_metrics import JobMetrics, start_metrics
+from novastream_profile import PROFILE_DIR, SessionProfiler
+
+# ── Constants ────────────────────────────────────────────────────────────────
+CONFIG_FILE  = os.path.join(os.path.expanduser("~"), ".novastream_settings.json")
+CACHE_DIR    = os.path.join(os.path.expanduser("~"), ".novastream_cache")
+JOURNAL_DIR  = os.path.join(os.path.expanduser("~"), ".novastream_jobs")   # one per process
+LOG_FILE     = os.path.join(os.path.expanduser("~"), ".novastream.log")
+ARCHIVE_FILE = os.path.join(os.path.expanduser("~"), ".novastream_archive.txt")
+METRICS_FILE = os.path.join(os.path.expanduser("~"), ".novastream_metrics.jsonl")
+
+MAX_WORKERS  = 8
+CONNECTION_CHOICES = ["1", "2", "4", "8", "16"]
+QUALITY_CHOICES    = ["best", "1080", "720", "480", "360", "240"]
+AUDIO_FORMATS      = ["mp3", "original"]   # original = the native stream, remuxed
+RATE_CHOICES = [0, 256, 512, 1024, 2048, 5120, 10240, 25600]   # KiB/s, 0 = no limit
+THROTTLE_BLOCK = 64 * 1024  # read size under a limit: trickle, don't burst and sleep
+PRIORITY_WEIGHTS = {"high": 4, "normal": 2, "background": 1}   # bandwidth shares
+PRIORITIES   = list(PRIORITY_WEIGHTS)
+POST_WORKERS = os.cpu_count() or 2     # concurrent ffmpeg post-processing runs
+POST_BACKLOG = MAX_WORKERS  # finished downloads waiting for ffmpeg before workers block
+JOB_RETRIES  = 2           # extra attempts per job after a DownloadError
+RETRY_DELAY  = 5           # seconds, doubled on every further attempt
+PROGRESS_HZ  = 15          # job rows / overview refresh rate
+INFO_TTL     = 3 * 3600    # seconds; signed format URLs expire after a few hours
+INFO_MAX_MB  = 64
+SETTINGS_DELAY = 0.5       # quiet period before changed settings are written
+DISK_MARGIN  = 100 * 1024 * 1024   # bytes always left free on the target disk
+SPACE_WAIT   = 30          # seconds before a job waiting for disk space retries
+LOG_FILE_MB  = 1           # per log file, with LOG_BACKUPS rotated copies
+LOG_BACKUPS  = 3
+METRICS_MB   = 4           # metrics file size before it is moved to .1
+COMPACT_LINES = 2000       # journal records between two compactions
+UNFINISHED   = ("queued", "running", "postprocessing")
+MAX_FINISHED = 100         # finished jobs kept in DownloadEngine.jobs (and as GUI rows)
+
+# ── Engine warm-up ───────────────────────────────────────────────────────────
+# yt-dlp (with its extractors) and imageio_ffmpeg take longer to import than
+# the whole UI takes to build, so the GUI runs warm_up() on a background
+# thread once the window is up. Until then these names are None.
+yt_dlp         = None
+imageio_ffmpeg = None
+ytdl           = None          # novastream_ytdl: our yt-dlp subclasses
+ENGINE_READY   = threading.Event()
+ENGINE_ERROR   = None
+_warm_lock     = threading.Lock()
+
+
+def warm_up() -> bool:
+    """Import the download engine once; True when it is usable."""
+    global yt_dlp, imageio_ffmpeg, ytdl, ENGINE_ERROR
+    with _warm_lock:
+        if not ENGINE_READY.is_set():
+            try:
+                import yt_dlp
+                import yt_dlp.utils
+                import imageio_ffmpeg
+                import novastream_ytdl as ytdl
+                yt_dlp.extractor.gen_extractor_classes()
+            except Exception as e:
+                ENGINE_ERROR = e
+            ENGINE_READY.set()
+    return ENGINE_ERROR is None
+
+
+# ── Security: allowed URL schemes ────────────────────────────────────────────
+ALLOWED_SCHEMES = {"http", "https"}
+
+# Shared by the GUI and the CLI; the engine only reads the download keys
+DEFAULT_SETTINGS = {
+    "theme":       "dark",
+    "palette":     "blueish-white",
+    "auto_open":   False,
+    "show_speed":  True,
+    "mp3_quality": "128",
+    "language":    "en",
+    "max_workers": 3,
+    "connections": 4,
+    "format_policy": "best",   # novastream_formats.POLICIES
+    "rate_limit":  0,          # KiB/s shared by all downloads, 0 = unlimited
+    "batch_mode":  False,
+    "skip_archived": True,     # skip media already in ARCHIVE_FILE
+    "archive_hash":  False,    # also store the SHA-256 of each finished file
+    "ffmpeg":      {},         # probe cache: path, mtime, version, encoders, muxers
+    "job_metrics": True,       # one timing record per finished job in METRICS_FILE
+    "metrics_port": 0,         # Prometheus /metrics on 127.0.0.1, 0 = off
+    "profile":     False,      # sampled stacks / tracemalloc dumps (novastream_profile)
+    "api_enabled": False,      # local job API (novastream_api)
+    "api_host":    "127.0.0.1",
+    "api_port":    8787,
+    "api_token":   "",         # required as a Bearer token when set
+}
+
+
+# ── Security helpers ──────────────────────────────────────────────────────────
+def sanitize_url(raw: str):
+    """Return cleaned URL string, or None if unsafe/invalid."""
+    url = raw.strip()
+    if re.search(r'[;&|`$<>\'"\\]', url):
+        return None
+    try:
+        p = urlparse(url)
+    except Exception:
+        return None
+    if p.scheme not in ALLOWED_SCHEMES:
+        return None
+    if not p.netloc:
+        return None
+    return url
+
+
+def sanitize_path(path: str) -> str:
+    """Resolve and expand path; raise ValueError on null bytes."""
+    if "\x00" in path:
+        raise ValueError("Null byte in path")
+    return os.path.realpath(os.path.expanduser(path))
+
+
+# ── Log file ──────────────────────────────────────────────────────────────────
+log = logging.getLogger("novastream")
+_log_queue    = None
+_log_listener = None
+
+
+def setup_file_log(path: str) -> logging.handlers.QueueListener:
+    """Send the ``novastream`` logger to a size-rotated file.
+
+    Records go through a QueueHandler and a listener thread writes them,
+    so logging from the Tk thread never waits on the disk. flush_file_log()
+    waits for the file to catch up, close_file_log() at exit.
+    """
+    global _log_queue, _log_listener
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_FILE_MB * 1024 * 1024, backupCount=LOG_BACKUPS,
+        encoding="utf-8", delay=True,
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s  %(message)s"))
+    _log_queue    = queue.Queue()
+    _log_listener = logging.handlers.QueueListener(_log_queue, handler)
+    _log_listener.start()
+    log.addHandler(logging.handlers.QueueHandler(_log_queue))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    return _log_listener
+
+
+def flush_file_log():
+    """Wait until every record logged so far is in the file."""
+    if _log_queue is not None:
+        _log_queue.join()
+
+
+def close_file_log():
+    """Write what is still queued and stop the listener thread."""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+
+
+def read_full_log(path: str) -> str:
+    """The rotated backups (oldest first) followed by the live file."""
+    chunks = []
+    for p in [f"{path}.{i}" for i in range(LOG_BACKUPS, 0, -1)] + [path]:
+        try:
+            with open(p, "r", encoding="utf-8", errors="replace") as f:
+                chunks.append(f.read())
+        except OSError:
+            pass
+    return "".join(chunks)
+
+
+# ── Settings persistence ──────────────────────────────────────────────────────
+def load_settings(path: str) -> dict:
+    """The settings file over DEFAULT_SETTINGS; the defaults if it is unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("corrupt")
+    except Exception:
+        return dict(DEFAULT_SETTINGS)
+    for k, v in DEFAULT_SETTINGS.items():
+        data.setdefault(k, v)
+    # Guard unknowns
+    if not isinstance(data["max_workers"], int) or not 1 <= data["max_workers"] <= MAX_WORKERS:
+        data["max_workers"] = DEFAULT_SETTINGS["max_workers"]
+    if str(data["connections"]) not in CONNECTION_CHOICES:
+        data["connections"] = DEFAULT_SETTINGS["connections"]
+    if data["format_policy"] not in POLICIES:
+        data["format_policy"] = DEFAULT_SETTINGS["format_policy"]
+    if not isinstance(data["rate_limit"], int) or data["rate_limit"] < 0:
+        data["rate_limit"] = DEFAULT_SETTINGS["rate_limit"]
+    if not isinstance(data["ffmpeg"], dict):
+        data["ffmpeg"] = {}
+    if not isinstance(data["api_port"], int) or not 0 < data["api_port"] < 65536:
+        data["api_port"] = DEFAULT_SETTINGS["api_port"]
+    if not isinstance(data["metrics_port"], int) or not 0 <= data["metrics_port"] < 65536:
+        data["metrics_port"] = DEFAULT_SETTINGS["metrics_port"]
+    return data
+
+
+class SettingsWriter:
+    """Write-behind persistence for the settings dict.
+
+    save() only snapshots the dict; a background thread writes the latest
+    snapshot once no change has arrived for ``delay`` seconds, through a
+    temp file and os.replace so a crash never leaves a half-written file.
+    flush() writes whatever is pending right away (used on exit).
+    """
+
+    def __init__(self, path: str, delay: float):
+        self.path     = path
+        self.delay    = delay
+        self._cond    = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._pending = None
+        self._due     = 0.0
+        self._seq     = 0            # bumped per save …
+        self._written = 0            # … so an older snapshot never wins
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def save(self, settings: dict):
+        # Values are replaced, never mutated in place, so a shallow copy is a snapshot
+        with self._cond:
+            self._seq    += 1
+            self._pending = (self._seq, dict(settings))
+            self._due     = time.monotonic() + self.delay
+            self._cond.notify()
+
+    def flush(self):
+        with self._cond:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            self._write(*pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                wait = self._due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                pending, self._pending = self._pending, None
+            self._write(*pending)
+
+    def _write(self, seq: int, snapshot: dict):
+        with self._io_lock:
+            if seq <= self._written:
+                return
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                self._written = seq
+            except Exception:
+                pass
+
+
+# ── ffmpeg capabilities ───────────────────────────────────────────────────────
+def probe_ffmpeg(exe: str) -> dict:
+    """Version string, encoder names and muxer names of an ffmpeg binary."""
+    def run(*args) -> str:
+        return subprocess.run(
+            [exe, "-hide_banner", *args], capture_output=True, text=True, timeout=30,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        ).stdout
+
+    m = re.search(r"ffmpeg version (\S+)", run("-version"))
+    encoders = re.findall(r"^ [VAS][A-Z.]{5} (\S+)", run("-encoders"), re.M)
+    muxers   = re.findall(r"^ [D ]E[d ] +(\S+)", run("-muxers"), re.M)
+    return {
+        "version":  m.group(1) if m else "?",
+        "encoders": sorted(set(encoders) - {"="}),
+        "muxers":   sorted({n for names in muxers for n in names.split(",")}),
+    }
+
+
+def resolve_ffmpeg(cached: dict) -> dict:
+    """The cached probe while the binary is unchanged, else resolve and re-probe.
+
+    The cache is keyed by binary path and mtime, so replacing or upgrading
+    ffmpeg is picked up on the next start. Needs warm_up() first.
+    """
+    path = os.getenv("IMAGEIO_FFMPEG_EXE") or cached.get("path")
+    if path and path == cached.get("path"):
+        try:
+            if os.path.getmtime(path) == cached.get("mtime"):
+                return cached
+        except OSError:
+            pass
+    path = imageio_ffmpeg.get_ffmpeg_exe()
+    return dict(probe_ffmpeg(path), path=path, mtime=os.path.getmtime(path))
+
+
+# ── Progress model ────────────────────────────────────────────────────────────
+class RateEstimator:
+    """Smoothed speed and ETA from yt-dlp's raw byte counters.
+
+    Speed is an exponentially weighted moving average whose weight depends
+    on the time since the previous sample (time constant ``tau`` seconds),
+    so irregular hook intervals do not skew it.
+    """
+
+    def __init__(self, tau: float = 3.0):
+        self.tau = tau
+        self.reset()
+
+    def reset(self):
+        self.speed  = 0.0            # bytes/s
+        self.eta    = None           # seconds
+        self.pct    = 0.0
+        self._t     = None
+        self._bytes = 0
+
+    def update(self, downloaded: int, total, speed=None, now: float = None):
+        now = time.monotonic() if now is None else now
+        if downloaded < self._bytes:
+            self.reset()             # next file of a merge, or a restart
+        if speed is None and self._t is not None and now > self._t:
+            speed = (downloaded - self._bytes) / (now - self._t)
+        if speed is not None:
+            if self._t is None or not self.speed:
+                self.speed = float(speed)
+            else:
+                alpha = 1.0 - math.exp(-(now - self._t) / self.tau)
+                self.speed += alpha * (speed - self.speed)
+        self._t, self._bytes = now, downloaded
+        self.pct = max(0.0, min(downloaded / total, 1.0)) if total else 0.0
+        self.eta = (total - downloaded) / self.speed if total and self.speed > 0 else None
+
+
+def format_size(n: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.2f} GiB"
+
+
+def format_rate(bps: float) -> str:
+    return format_size(bps) + "/s"
+
+
+def format_eta(seconds: float) -> str:
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+def parse_rate(text: str) -> int:
+    """Bytes/s from "500K", "2M", "1.5m" or a plain byte count; 0 = unlimited."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kKmMgG]?)(?:i?B(?:/s)?)?\s*", text or "")
+    if not m:
+        raise ValueError(f"not a rate: {text!r}")
+    return int(float(m.group(1)) * 1024 ** " KMG".index(m.group(2).upper() or " "))
+
+
+# ── Bandwidth limit ───────────────────────────────────────────────────────────
+class BandwidthLimiter:
+    """One token bucket shared by every download, split by job priority.
+
+    The global rate (bytes/s, 0 = unlimited) is divided among the jobs that
+    moved data within the last ACTIVE seconds in proportion to
+    PRIORITY_WEIGHTS, so a background job yields to a high-priority one
+    yet never stops, and an idle job's share goes to the others. A job
+    over its share sleeps in short ticks, so set_rate() and priority
+    changes take effect on running downloads within one TICK.
+    """
+
+    TICK   = 0.1                 # longest sleep before re-reading the rate
+    BURST  = 0.25                # seconds of a job's share it may bank
+    ACTIVE = 1.0
+
+    def __init__(self, rate: int = 0):
+        self.rate  = max(0, int(rate))
+        self._lock = threading.Lock()
+        self._jobs = {}              # job id → [weight, tokens, last refill, last use]
+        self._seen = {}              # job id → (file, cumulative bytes already charged)
+
+    def set_rate(self, rate: int):
+        with self._lock:
+            self.rate = max(0, int(rate))
+
+    def consume(self, job, nbytes: int):
+        """Charge ``nbytes`` to ``job``, sleeping while it is over its share."""
+        charged = False
+        while True:
+            with self._lock:
+                if self.rate <= 0 or nbytes <= 0:
+                    return
+                now = time.monotonic()
+                st  = self._jobs.setdefault(job.id, [1, 0.0, now, now])
+                st[0], st[3] = PRIORITY_WEIGHTS.get(job.priority, 1), now
+                active = sum(s[0] for s in self._jobs.values() if now - s[3] < self.ACTIVE)
+                share  = self.rate * st[0] / active
+                st[1]  = min(st[1] + (now - st[2]) * share, share * self.BURST)
+                st[2]  = now
+                if not charged:
+                    st[1] -= nbytes  # may go into debt; paid off below
+                    charged = True
+                if st[1] >= 0:
+                    return
+                wait = min(self.TICK, -st[1] / share)
+            time.sleep(wait)
+
+    def consume_total(self, job, name: str, total: int):
+        """consume() the growth of the byte counter of file ``name``.
+
+        Progress hooks report cumulative totals, from several threads for
+        fragmented formats; a late, smaller total of the same file is not
+        charged twice. The first total seen for a file is only the baseline:
+        yt-dlp counts bytes resumed from a .part file in it, and those are
+        on disk already (a fresh file goes uncharged for one block).
+        """
+        with self._lock:
+            seen_name, seen = self._seen.get(job.id, (None, 0))
+            if seen_name != name:
+                seen = total         # a new file, or the next format of a merge
+            self._seen[job.id] = (name, max(seen, total))
+        self.consume(job, total - seen)
+
+    def forget(self, job):
+        with self._lock:
+            self._jobs.pop(job.id, None)
+            self._seen.pop(job.id, None)
+
+
+# ── Extraction cache ──────────────────────────────────────────────────────────
+class InfoCache:
+    """On-disk LRU of raw extract_info results, one JSON file per media item.
+
+    Entries older than ``ttl`` seconds are dropped on read; once the folder
+    grows past ``max_bytes`` the least recently used files are evicted.
+    """
+
+    def __init__(self, root: str, ttl: float, max_bytes: int):
+        self.root      = root
+        self.ttl       = ttl
+        self.max_bytes = max_bytes
+        self._lock     = threading.Lock()
+        self._index    = {}          # file name → [last use, size]
+        try:
+            os.makedirs(root, exist_ok=True)
+            for entry in os.scandir(root):
+                if entry.name.endswith(".json"):
+                    st = entry.stat()
+                    self._index[entry.name] = [st.st_mtime, st.st_size]
+        except OSError:
+            pass
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        """Extractor + video ID when yt-dlp can tell from the URL alone."""
+        for ie in yt_dlp.extractor.gen_extractor_classes():
+            if ie.ie_key() != "Generic" and ie.suitable(url):
+                vid = ie.get_temp_id(url)
+                if vid:
+                    return f"{ie.ie_key()}:{vid}"
+                break
+        return urlparse(url)._replace(fragment="").geturl()
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json"
+
+    def get(self, key: str):
+        name = self._name(key)
+        path = os.path.join(self.root, name)
+        with self._lock:
+            if name not in self._index:
+                return None
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                self._drop(name)
+                return None
+            if data.get("key") != key or time.time() - data.get("ts", 0) > self.ttl:
+                self._drop(name)
+                return None
+            now = time.time()
+            self._index[name][0] = now
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            return data.get("info")
+
+    def put(self, key: str, info: dict):
+        name = self._name(key)
+        path = os.path.join(self.root, name)
+        blob = json.dumps({"key": key, "ts": time.time(), "info": info},
+                          ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            try:
+                tmp = path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(blob)
+                os.replace(tmp, path)
+            except OSError:
+                return
+            self._index[name] = [time.time(), len(blob.encode("utf-8"))]
+            self._evict()
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._drop(self._name(key))
+
+    def _evict(self):
+        total = sum(size for _, size in self._index.values())
+        for name, (_, size) in sorted(self._index.items(), key=lambda kv: kv[1][0]):
+            if total <= self.max_bytes:
+                break
+            self._drop(name)
+            total -= size
+
+    def _drop(self, name: str):
+        self._index.pop(name, None)
+        try:
+            os.remove(os.path.join(self.root, name))
+        except OSError:
+            pass
+
+
+# ── Download archive ──────────────────────────────────────────────────────────
+class DownloadArchive:
+    """Every finished media item, as ``<extractor> <id> [sha256]`` lines.
+
+    The first two fields are yt-dlp's archive IDs, so the object can be
+    passed as its ``download_archive`` (a set-like). The GUI and the CLI
+    append to the same file; each lookup first reads whatever another
+    process added since, so they never fetch the same item twice.
+    """
+
+    def __init__(self, path: str):
+        self.path  = path
+        self._ids  = set()
+        self._pos  = 0               # bytes of the file already read
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size < self._pos:         # replaced or truncated: start over
+            self._ids.clear()
+            self._pos = 0
+        if size == self._pos:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._pos)
+                data = f.read()
+        except OSError:
+            return
+        end = data.rfind(b"\n") + 1  # a line still being written waits
+        for line in data[:end].decode("utf-8", "replace").splitlines():
+            key = " ".join(line.split()[:2])
+            if key:
+                self._ids.add(key)
+        self._pos += end
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return key in self._ids
+
+    def __bool__(self) -> bool:
+        return True                  # yt-dlp skips lookups in an empty archive
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, key: str, path: str = None):
+        """Record ``key``, with the SHA-256 of ``path`` when one is given."""
+        line = key
+        if path:
+            try:
+                line += " " + file_sha256(path)
+            except OSError:
+                pass
+        with self._lock:
+            if key in self._ids:
+                return
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                log.warning("archive: %s", e)
+            self._ids.add(key)
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ── Disk space ────────────────────────────────────────────────────────────────
+class DiskSpaceError(Exception):
+    """A job would not fit on its disk. ``wait`` when it would without the
+    space other running jobs have reserved, i.e. it may fit after them."""
+
+    def __init__(self, needed: int, free: int, wait: bool):
+        super().__init__(f"not enough disk space: needs {format_size(needed)}, "
+                         f"{format_size(free)} free")
+        self.needed = needed
+        self.free   = free
+        self.wait   = wait
+
+
+def estimate_bytes(info: dict) -> int:
+    """Download size of the selected format(s) from the extractor's
+    filesize / filesize_approx, or bitrate × duration; 0 when unknown."""
+    total = 0
+    for f in info.get("requested_formats") or [info]:
+        size = f.get("filesize") or f.get("filesize_approx")
+        if not size and f.get("tbr") and info.get("duration"):
+            size = f["tbr"] * 1000 / 8 * info["duration"]
+        if not size:
+            return 0
+        total += size
+    return int(total)
+
+
+def disk_free(path: str) -> tuple:
+    """(device, free bytes) of the filesystem ``path`` is or will be on."""
+    path = os.path.abspath(path)
+    while not os.path.isdir(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return os.stat(path).st_dev, shutil.disk_usage(path).free
+
+
+# ── YoutubeDL pool ────────────────────────────────────────────────────────────
+class YdlPool:
+    """Worker-scoped YoutubeDL instances, reused while the job options match.
+
+    Reuse keeps the HTTP session, cookie jar, keep-alive connections and
+    loaded extractors between jobs; a change in settings simply produces a
+    new options key and therefore a fresh instance. Progress is routed
+    through ``on_progress(job, d)`` and the segmented downloader's byte
+    accounting through ``throttle(job, nbytes)``, the selected formats
+    through ``preflight(job, ydl, info)`` and finished files through
+    ``defer_post(job, ydl, filename, info, files_to_move)``, so one
+    instance can serve any job.
+    """
+
+    PER_THREAD = 2
+
+    def __init__(self, on_progress, throttle=None, defer_post=None, preflight=None):
+        self._on_progress = on_progress
+        self._throttle    = throttle
+        self._defer_post  = defer_post
+        self._preflight   = preflight
+        self._local       = threading.local()
+
+    def _slots(self) -> collections.OrderedDict:
+        slots = getattr(self._local, "slots", None)
+        if slots is None:
+            slots = self._local.slots = collections.OrderedDict()
+        return slots
+
+    @staticmethod
+    def _key(opts: dict) -> str:
+        return json.dumps(opts, sort_keys=True, default=str)
+
+    def acquire(self, opts: dict, job=None) -> "yt_dlp.YoutubeDL":
+        slots = self._slots()
+        key   = self._key(opts)
+        slot  = slots.pop(key, None)
+        if slot is None:
+            slot = {"job": None}
+            hook = lambda d, s=slot: self._on_progress(s["job"], d)
+            slot["ydl"] = ytdl.NovaYoutubeDL(dict(opts, progress_hooks=[hook]))
+            if self._throttle is not None:
+                slot["ydl"].throttle = lambda n, s=slot: self._throttle(s["job"], n)
+            if self._defer_post is not None:
+                slot["ydl"].defer_post = lambda *a, s=slot: self._defer_post(s["job"], *a)
+            if self._preflight is not None:
+                slot["ydl"].preflight = lambda *a, s=slot: self._preflight(s["job"], *a)
+        slots[key] = slot            # most recently used goes last
+        while len(slots) > self.PER_THREAD:
+            _, old = slots.popitem(last=False)
+            self._close(old["ydl"])
+        slot["job"] = job
+        return slot["ydl"]
+
+    def discard(self, opts: dict):
+        """Drop this thread's instance for ``opts``, e.g. after a failure."""
+        slot = self._slots().pop(self._key(opts), None)
+        if slot is not None:
+            self._close(slot["ydl"])
+
+    def close_thread(self):
+        slots = self._slots()
+        while slots:
+            self._close(slots.popitem()[1]["ydl"])
+
+    @staticmethod
+    def _close(ydl):
+        try:
+            ydl.close()
+        except Exception:
+            pass
+
+
+# ── Job queue ─────────────────────────────────────────────────────────────────
+class DownloadJob:
+    """One download request, with the UI choices snapshotted at submit time."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, url: str, is_audio: bool, quality: str,
+                 langs: list, out_dir: str, expand: bool = False,
+                 priority: str = "normal", audio_format: str = "mp3"):
+        self.id       = next(DownloadJob._ids)
+        self.uid      = uuid.uuid4().hex   # stable across restarts, for the journal
+        self.url      = url
+        self.is_audio = is_audio
+        self.audio_format = audio_format   # one of AUDIO_FORMATS, when is_audio
+        self.quality  = quality
+        self.langs    = list(langs)
+        self.out_dir  = out_dir
+        self.expand   = expand       # flat-extract first, fan entries out as jobs
+        self.priority = priority     # key of PRIORITY_WEIGHTS
+        self.parent   = None         # id of the playlist job that spawned this one
+        self.title    = url
+        self.state    = "queued"     # queued | running | postprocessing | done | error | cancelled
+        self.cancelled = False       # set by DownloadEngine.cancel()
+        self.attempts = 0
+        self.parts    = set()        # .part files seen in progress events
+        self.post     = []           # finished files awaiting ffmpeg: (filename, info, files_to_move)
+        self.opts     = None         # YoutubeDL options of the last attempt
+        self.status   = "queued"     # STRINGS key shown in the job row …
+        self.status_args = ()        # … and its format arguments
+        self.rate     = RateEstimator()
+        self.pct      = 0.0
+        self.speed    = 0.0          # bytes/s, smoothed
+        self.marks    = {}           # phase → time.time() it was reached (novastream_metrics)
+        self.pp_times = []           # (postprocessor, seconds) of the last attempt
+        self.bytes    = 0            # media bytes downloaded by the last attempt
+
+    SPEC = ("url", "is_audio", "audio_format", "quality", "langs", "out_dir", "expand",
+            "priority", "title")
+
+    def spec(self) -> dict:
+        return {k: getattr(self, k) for k in self.SPEC}
+
+    @classmethod
+    def from_spec(cls, uid: str, spec: dict) -> "DownloadJob":
+        job = cls(spec["url"], spec["is_audio"], spec["quality"], spec["langs"],
+                  spec["out_dir"], expand=spec.get("expand", False),
+                  priority=spec.get("priority", "normal"),
+                  audio_format=spec.get("audio_format", "mp3"))
+        job.uid   = uid
+        job.title = spec.get("title") or job.url
+        return job
+
+    def spawn(self, url: str, title: str = "") -> "DownloadJob":
+        """Child job for one playlist entry, with the same choices."""
+        child = DownloadJob(url, self.is_audio, self.quality, self.langs, self.out_dir,
+                            priority=self.priority, audio_format=self.audio_format)
+        child.title  = title or url
+        child.parent = self.id
+        return child
+
+    def progress(self) -> dict:
+        eta = self.rate.eta
+        return {
+            "status": self.status,
+            "pct":    round(self.pct * 100, 1),
+            "speed":  round(self.speed),     # bytes/s
+            "eta":    round(eta, 1) if eta is not None else None,
+        }
+
+    def as_dict(self) -> dict:
+        return dict({"id": self.id, "uid": self.uid, "parent": self.parent,
+                     "state": self.state, "attempts": self.attempts},
+                    **self.spec(), **self.progress())
+
+
+class DownloadQueue:
+    """FIFO of jobs served by a resizable pool of daemon worker threads."""
+
+    def __init__(self, run_job, workers: int, on_exit=None):
+        self._run_job = run_job
+        self._on_exit = on_exit      # called in a worker thread as it retires
+        self._q       = queue.Queue()
+        self._lock    = threading.Lock()
+        self._alive   = 0
+        self._target  = 0
+        self.resize(workers)
+
+    def submit(self, job: DownloadJob):
+        self._q.put(job)
+
+    def pending(self) -> int:
+        return self._q.qsize()
+
+    def resize(self, n: int):
+        """Grow immediately; surplus workers exit once they are idle."""
+        n = max(1, min(int(n), MAX_WORKERS))
+        with self._lock:
+            self._target = n
+            while self._alive < n:
+                self._alive += 1
+                threading.Thread(target=self._worker, daemon=True).start()
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                retire = self._alive > self._target
+                if retire:
+                    self._alive -= 1
+            if retire:
+                if self._on_exit:
+                    self._on_exit()
+                return
+            try:
+                job = self._q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._run_job(job)
+            finally:
+                self._q.task_done()
+
+
+class PostProcessQueue:
+    """Bounded FIFO of downloaded jobs awaiting ffmpeg, one worker per core.
+
+    A download worker hands its job over and moves on to the next transfer.
+    When ffmpeg falls behind, submit() blocks the download workers, so
+    unprocessed files cannot pile up on disk without limit.
+    """
+
+    def __init__(self, run_job, workers: int, backlog: int):
+        self._run_job = run_job
+        self._workers = workers
+        self._q       = queue.Queue(maxsize=backlog)
+        self._started = False
+        self._lock    = threading.Lock()
+
+    def submit(self, job: DownloadJob):
+        with self._lock:
+            if not self._started:        # most sessions never post-process
+                self._started = True
+                for _ in range(self._workers):
+                    threading.Thread(target=self._worker, daemon=True).start()
+        self._q.put(job)
+
+    def _worker(self):
+        while True:
+            job = self._q.get()
+            try:
+                self._run_job(job)
+            finally:
+                self._q.task_done()
+
+
+class ProgressChannel:
+    """Latest-value slot per job between the workers and the front-end.
+
+    Workers overwrite their job's fields and mark it dirty; the front-end
+    drains the dirty set on its own clock (the GUI at PROGRESS_HZ), so a
+    burst of progress events costs a dict store each and a single repaint
+    per job.
+    """
+
+    def __init__(self):
+        self._lock  = threading.Lock()
+        self._dirty = {}
+
+    def post(self, job: DownloadJob, status: str = None, *args):
+        with self._lock:
+            if status is not None:
+                job.status, job.status_args = status, args
+            self._dirty[job.id] = job
+
+    def drain(self) -> list:
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        return list(dirty.values())
+
+
+def try_lock(f) -> bool:
+    """Take an exclusive lock on open file ``f`` without waiting; it is
+    held until ``f`` is closed or the process ends."""
+    try:
+        if os.name == "nt":
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def read_journal(path: str) -> dict:
+    """Fold a journal file into {uid: {"state", "spec", "parts"}}."""
+    jobs = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue         # torn last line after a crash
+                cur = jobs.setdefault(rec.get("uid"), {"state": None, "spec": None, "parts": []})
+                cur["state"] = rec.get("state", cur["state"])
+                if rec.get("spec"):
+                    cur["spec"] = rec["spec"]
+                if rec.get("part") and rec["part"] not in cur["parts"]:
+                    cur["parts"].append(rec["part"])
+    except OSError:
+        pass
+    return {uid: j for uid, j in jobs.items() if uid and j["spec"]}
+
+
+def journal_lines(jobs: dict) -> list:
+    """The records that replay into ``jobs`` (as from read_journal)."""
+    lines = []
+    for uid, j in jobs.items():
+        lines.append(json.dumps({"uid": uid, "state": j["state"], "spec": j["spec"]},
+                                ensure_ascii=False) + "\n")
+        lines += [json.dumps({"uid": uid, "part": part}) + "\n" for part in j["parts"]]
+    return lines
+
+
+class JobJournal:
+    """Append-only JSONL record of job specs and state changes.
+
+    Every process (the window, each headless CLI) writes its own file in
+    ``folder`` and holds a lock on it while it runs, so two of them never
+    resume or compact each other's live jobs. adopt() takes over the files
+    of processes that are gone.
+
+    add() and update() only queue a line; a background thread writes
+    whatever has queued up and fsyncs it once, so neither the Tk thread nor
+    the API's event loop ever waits on the disk, and a burst of updates
+    costs one fsync. flush() writes the queue right away (used on exit);
+    whatever the app was doing when it died can be read back by replay().
+
+    Finished jobs are only needed until the next compact(), which the
+    writer thread runs after every COMPACT_LINES records, so the file stays
+    about as long as the list of unfinished jobs.
+    """
+
+    def __init__(self, folder: str):
+        self.folder   = folder
+        self.path     = os.path.join(folder, time.strftime("%Y%m%d-%H%M%S")
+                                     + f"-{os.getpid()}-{uuid.uuid4().hex[:6]}.jsonl")
+        self._cond    = threading.Condition()
+        self._io_lock = threading.RLock()
+        self._lines   = []
+        self._since   = 0            # records written since the last compact()
+        self._held    = None         # our open, locked .lock file
+        try:
+            os.makedirs(folder, exist_ok=True)
+            self._held = open(self.path + ".lock", "a+")
+            try_lock(self._held)
+        except OSError:
+            pass
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _append(self, rec: dict):
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._cond:
+            self._lines.append(line)
+            self._cond.notify()
+
+    def add(self, job: DownloadJob):
+        self._append({"uid": job.uid, "state": job.state, "spec": job.spec()})
+
+    def update(self, job: DownloadJob, **extra):
+        self._append(dict({"uid": job.uid, "state": job.state}, **extra))
+
+    def discard(self, uids):
+        """Mark jobs from adopt() as given up, so the next compact() drops them."""
+        for uid in uids:
+            self._append({"uid": uid, "state": "discarded"})
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._lines:
+                    self._cond.wait()
+            self.flush()
+            if self._since >= COMPACT_LINES:
+                self.compact()
+
+    def flush(self):
+        with self._io_lock:
+            with self._cond:
+                lines, self._lines = self._lines, []
+            if not lines:
+                return
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError:
+                pass
+            self._since += len(lines)
+
+    def replay(self) -> dict:
+        """This process's jobs, as {uid: {"state", "spec", "parts"}}."""
+        return read_journal(self.path)
+
+    def compact(self):
+        """Atomically rewrite the log with just its unfinished jobs."""
+        tmp = self.path + ".tmp"
+        with self._io_lock:
+            self.flush()
+            keep = {uid: j for uid, j in self.replay().items() if j["state"] in UNFINISHED}
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.writelines(journal_lines(keep))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except OSError:
+                return
+            self._since = 0
+
+    def adopt(self) -> dict:
+        """Move the unfinished jobs of processes that ended into this
+        journal and delete their files; returns those jobs."""
+        adopted = {}
+        try:
+            # A process that never wrote a job left just its .lock
+            names = {n[:-len(".lock")] if n.endswith(".lock") else n
+                     for n in os.listdir(self.folder) if n.endswith((".jsonl", ".jsonl.lock"))}
+        except OSError:
+            return adopted
+        for name in sorted(names):
+            path = os.path.join(self.folder, name)
+            if path == self.path:
+                continue
+            try:
+                lock = open(path + ".lock", "a+")
+            except OSError:
+                continue
+            with lock:
+                if not try_lock(lock):
+                    continue         # its process is still running
+                jobs = {uid: j for uid, j in read_journal(path).items()
+                        if j["state"] in UNFINISHED}
+                with self._cond:
+                    self._lines += journal_lines(jobs)
+                self.flush()         # ours before theirs is gone
+                adopted.update(jobs)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            try:
+                os.remove(path + ".lock")
+            except OSError:
+                pass
+        return adopted
+
+
+# ── Engine ────────────────────────────────────────────────────────────────────
+class DownloadEngine:
+    """The download pipeline shared by the GUI and the headless CLI.
+
+    Front-ends submit DownloadJobs, poll ``progress`` for display updates
+    and receive discrete events through ``listener(event, job, info)``,
+    called from worker threads:
+
+      queued / started / postprocessing / done / retry / waiting / expanded /
+      error / cancelled / no_mp3
+      ready / engine_error / ffmpeg / ffmpeg_error         (job is None)
+
+    More listeners (e.g. the job API) can be added with add_listener();
+    ``metrics`` (novastream_metrics.JobMetrics) is always one of them.
+    """
+
+    def __init__(self, settings: dict, listener, workers: int = None,
+                 settings_path: str = CONFIG_FILE):
+        self.settings     = settings
+        self.listeners    = [listener]
+        self.jobs         = {}       # job id → DownloadJob, MAX_FINISHED finished at most
+        self._finished    = collections.deque()   # ids of finished jobs, oldest first
+        self._lock        = threading.Lock()   # queued → running / cancelled, and jobs
+        self._reserved    = {}       # job id → (device, bytes) it will still write
+        self.ffmpeg       = {}       # resolve_ffmpeg() result, set by start()
+        self.ffmpeg_ready = threading.Event()
+        self.info_cache   = InfoCache(os.path.join(CACHE_DIR, "info"),
+                                      INFO_TTL, INFO_MAX_MB * 1024 * 1024)
+        self.journal      = JobJournal(JOURNAL_DIR)
+        self.archive      = DownloadArchive(ARCHIVE_FILE)
+        self.metrics      = JobMetrics(METRICS_FILE if settings["job_metrics"] else None,
+                                       METRICS_MB * 1024 * 1024)
+        self.profiler     = SessionProfiler() if settings["profile"] else None
+        self.skip_archived = settings["skip_archived"]
+        self.format_policy = settings["format_policy"]
+        self.progress     = ProgressChannel()
+        self.limiter      = BandwidthLimiter(settings["rate_limit"] * 1024)
+        self.ydl_pool     = YdlPool(self._progress_hook, self._throttle, self._defer_post,
+                                    self._preflight)
+        self.queue        = DownloadQueue(self._run_job, workers or settings["max_workers"],
+                                          on_exit=self.ydl_pool.close_thread)
+        self.post_queue   = PostProcessQueue(self._post_process, POST_WORKERS, POST_BACKLOG)
+        self._settings_writer = SettingsWriter(settings_path, SETTINGS_DELAY)
+        self.add_listener(self.metrics)
+
+    def add_listener(self, listener):
+        self.listeners = self.listeners + [listener]
+
+    def remove_listener(self, listener):
+        self.listeners = [fn for fn in self.listeners if fn is not listener]
+
+    def _emit(self, event: str, job: DownloadJob = None, **info):
+        for listener in self.listeners:
+            try:
+                listener(event, job, info)
+            except Exception:
+                pass                 # a broken front-end must not kill a worker
+        if job is not None and event in ("done", "error", "cancelled", "expanded"):
+            self._retire(job)
+
+    def _retire(self, job: DownloadJob):
+        """Forget the oldest finished jobs beyond MAX_FINISHED, once the
+        listeners have seen ``job`` finish."""
+        with self._lock:
+            self._finished.append(job.id)
+            while len(self._finished) > MAX_FINISHED:
+                self.jobs.pop(self._finished.popleft(), None)
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+    def start(self) -> bool:
+        """Import yt-dlp and resolve ffmpeg; blocking, so call it off the UI thread."""
+        if not warm_up():
+            self.ffmpeg_ready.set()
+            self._emit("engine_error", error=str(ENGINE_ERROR))
+            return False
+        self.archive.refresh()
+        try:
+            self.ffmpeg = resolve_ffmpeg(self.settings["ffmpeg"])
+        except Exception as e:
+            self._emit("ffmpeg_error", error=str(e))
+        else:
+            if self.ffmpeg is not self.settings["ffmpeg"]:
+                # Freshly probed: remember it for the next start
+                self.settings["ffmpeg"] = self.ffmpeg
+                self.save_settings()
+                self._emit("ffmpeg", version=self.ffmpeg["version"],
+                           encoders=len(self.ffmpeg["encoders"]),
+                           muxers=len(self.ffmpeg["muxers"]))
+        self.ffmpeg_ready.set()
+        self._emit("ready")
+        return True
+
+    def save_settings(self):
+        """Queue a write; rapid changes coalesce into one, off the caller's thread."""
+        self._settings_writer.save(self.settings)
+
+    def close(self):
+        self._settings_writer.flush()
+        self.journal.flush()
+        if self.profiler is not None:
+            self.profiler.close()
+
+    def busy(self) -> bool:
+        return any(j.state in UNFINISHED for j in self.snapshot())
+
+    def snapshot(self) -> list:
+        """The current jobs; iterate this, as workers add and retire jobs."""
+        with self._lock:
+            return list(self.jobs.values())
+
+    # ── Jobs ──────────────────────────────────────────────────────────────────
+    def submit(self, job: DownloadJob, journal: bool = True):
+        """Register a job and hand it to the pool."""
+        if journal:
+            self.journal.add(job)
+        job.marks["queued"] = time.time()
+        with self._lock:
+            self.jobs[job.id] = job
+        self._emit("queued", job)
+        self.queue.submit(job)
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued job now, a running one at its next progress event.
+
+        Partial files are kept. False when the job is unknown, finished or
+        already past its download (ffmpeg runs to completion).
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        with self._lock:
+            if job.state not in ("queued", "running"):
+                return False
+            job.cancelled = True
+            if job.state == "running":
+                return True
+            job.state = "cancelled"
+        self.journal.update(job)
+        self.progress.post(job, "cancelled")
+        self._emit("cancelled", job)
+        return True
+
+    def set_rate_limit(self, kib: int):
+        """Change the shared limit (KiB/s, 0 = none); running downloads follow."""
+        self.limiter.set_rate(kib * 1024)
+
+    def set_priority(self, job_id: int, priority: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or priority not in PRIORITY_WEIGHTS:
+            return False
+        job.priority = priority
+        return True
+
+    def unfinished(self) -> dict:
+        """Jobs earlier sessions left unfinished, as {uid: {"state", "spec",
+        "parts"}}; from now on this session's journal keeps them."""
+        return self.journal.adopt()
+
+    def resume(self, pending: dict):
+        """Re-queue ``pending`` (from unfinished())."""
+        for uid, j in pending.items():
+            job = DownloadJob.from_spec(uid, j["spec"])
+            job.parts.update(j["parts"])
+            # yt-dlp (and SegmentedHttpFD) continue from the .part files
+            self.submit(job, journal=False)
+
+    def discard(self, pending: dict):
+        """Drop ``pending`` (from unfinished()) from the journal for good."""
+        self.journal.discard(pending)
+
+    def ffmpeg_can(self, kind: str, name: str) -> bool:
+        """Whether the probed ffmpeg lists ``name`` among its ``kind``
+        ("encoders" / "muxers"); optimistic when nothing was probed."""
+        names = self.ffmpeg.get(kind)
+        return not names or name in names
+
+    def _build_opts(self, job: DownloadJob) -> dict:
+        opts = {
+            "ffmpeg_location":    self.ffmpeg.get("path"),
+            "outtmpl":            os.path.join(job.out_dir, "%(title)s.%(ext)s"),
+            "writesubtitles":     bool(job.langs),
+            "subtitleslangs":     job.langs or [],
+            "ignoreerrors":       False,
+            "quiet":              True,
+            "no_warnings":        True,
+            "noprogress":         True,      # hooks only; stdout is ours (JSON lines)
+            "postprocessor_args": [],        # prevent injection via args
+            "nocheckcertificate": False,     # keep TLS verification ON
+            # Parallel fragments for HLS/DASH, parallel ranges for plain http(s)
+            "concurrent_fragment_downloads": self.settings["connections"],
+            "segmented_connections":         self.settings["connections"],
+        }
+        if job.parent:
+            opts["noplaylist"] = True        # an entry is one item, never a list
+        if self.skip_archived:
+            # Lookups only: finished items are recorded by _post_process
+            opts["download_archive"] = self.archive
+        if self.limiter.rate:
+            # yt-dlp grows reads to ~1 s of line rate; the limiter charges per read
+            opts["buffersize"]     = THROTTLE_BLOCK
+            opts["noresizebuffer"] = True
+
+        if job.is_audio and job.audio_format == "mp3" and self.ffmpeg_can("encoders", "libmp3lame"):
+            kbps = self.settings["mp3_quality"]
+            # Cheapest transcode: an MP3 source is only copied, otherwise the
+            # audio-only stream with the lowest bitrate still at the target
+            opts["format"]      = "bestaudio[acodec=mp3]/bestaudio/best"
+            opts["format_sort"] = [f"+abr:{kbps}"]
+            opts["postprocessors"] = [{
+                "key":              "FFmpegExtractAudio",
+                "preferredcodec":   "mp3",
+                "preferredquality": kbps,
+            }]
+        elif job.is_audio:
+            # Original (or no MP3 encoder): m4a/opus/mp3 files are kept as
+            # downloaded, webm gets an .opus remux and any other known codec
+            # a copy into its own container. yt-dlp re-encodes to MP3 only a
+            # codec it has no container for, which fails without libmp3lame.
+            if job.audio_format == "mp3" and job.attempts <= 1:
+                self._emit("no_mp3", job)
+            opts["format"] = "bestaudio/best"
+            opts["postprocessors"] = [{"key": "FFmpegExtractAudio", "preferredcodec": "best"}]
+        else:
+            # Scored from the extracted list; mp4-friendly codecs first
+            merge_ext = "mp4" if self.ffmpeg_can("muxers", "mp4") else "mkv"
+            opts["format"]               = FormatPolicy(self.format_policy, job.quality, merge_ext)
+            opts["merge_output_format"]  = merge_ext
+        return opts
+
+    def _run_job(self, job: DownloadJob):
+        """Worker-thread body: run one job and report back through the channel."""
+        if not warm_up():            # jobs can be queued before start() is done
+            job.state = "error"
+            self.progress.post(job, "error")
+            self._emit("error", job, error=str(ENGINE_ERROR))
+            return
+        self.ffmpeg_ready.wait()
+        with self._lock:
+            if job.cancelled:
+                return               # cancelled while queued or awaiting a retry
+            job.state = "running"
+        posted = False               # True once the post thread owns the job
+        job.attempts += 1
+        job.post.clear()             # a retry downloads (or finds) its files again
+        now = time.time()
+        job.marks = {"queued": job.marks.get("queued", now), "started": now}
+        job.pp_times, job.bytes = [], 0
+        self.journal.update(job)
+        self.progress.post(job, "expanding" if job.expand else "starting")
+        self._emit("started", job, attempt=job.attempts)
+        opts = job.opts = self._build_opts(job)
+        try:
+            if self.profiler is not None:
+                self.profiler.begin(job, "run")
+            if job.expand and self._expand_job(job):
+                return
+            ydl = self.ydl_pool.acquire(opts, job)
+            info = self._extract(ydl, job)
+            job.marks["extracted"] = time.time()
+            # None: yt-dlp found the URL's ID in the archive before extracting
+            if info is None or (self.skip_archived and info.get("_type", "video") == "video"
+                                and ydl.in_download_archive(info)):
+                self._finish(job, skipped=True)
+                return
+            if job.cancelled:
+                raise yt_dlp.utils.DownloadCancelled("cancelled")
+            ydl.process_ie_result(info, download=True)
+            job.marks["downloaded"] = time.time()
+            if not any(ydl.has_post_process(info) for _, info, _ in job.post):
+                # Nothing for ffmpeg: just move the files, here, not behind merges
+                self._run_posts(job, ydl)
+                self._finish(job)
+                return
+            with self._lock:
+                if job.cancelled:
+                    raise yt_dlp.utils.DownloadCancelled("cancelled")
+                job.state = "postprocessing"
+            self.journal.update(job)
+            self.progress.post(job, "postprocessing")
+            self._emit("postprocessing", job, files=len(job.post))
+            posted = True
+            if self.profiler is not None:
+                self.profiler.end(job, "run")
+            self.post_queue.submit(job)  # blocks while ffmpeg is behind
+        except DiskSpaceError as e:
+            if e.wait:
+                job.attempts -= 1    # waiting is not a failed attempt
+                self._requeue(job, SPACE_WAIT, "waiting_space")
+                self._emit("waiting", job, needed=e.needed, free=e.free)
+            else:
+                job.state = "error"
+                self.journal.update(job)
+                self.progress.post(job, "error")
+                self._emit("error", job, error=str(e))
+        except yt_dlp.utils.DownloadCancelled:
+            self.ydl_pool.discard(opts)
+            job.state = "cancelled"
+            self.journal.update(job)
+            self.progress.post(job, "cancelled")
+            self._emit("cancelled", job)
+        except yt_dlp.utils.DownloadError as e:
+            msg = str(e)
+            self.ydl_pool.discard(opts)
+            # The cached format URLs may be the reason (expired or revoked)
+            self.info_cache.invalidate(InfoCache.key_for(job.url))
+            if job.attempts <= JOB_RETRIES and not job.cancelled:
+                self._schedule_retry(job)
+            else:
+                job.state = "error"
+                self.journal.update(job)
+                self.progress.post(job, "error")
+                self._emit("error", job, error=msg)
+        except Exception as e:
+            msg = str(e)
+            self.ydl_pool.discard(opts)
+            job.state = "error"
+            self.journal.update(job)
+            self.progress.post(job, "error")
+            self._emit("error", job, error=msg, unexpected=True)
+        finally:
+            job.speed = 0.0
+            self.limiter.forget(job)
+            if job.state != "postprocessing":
+                self._release(job)
+            if self.profiler is not None:
+                self.profiler.end(job, "run")
+                if not posted and job.state != "queued":    # queued: a retry follows
+                    self.profiler.finish(job)
+
+    def _post_process(self, job: DownloadJob):
+        """Post-processing-thread body: merge / convert a job's downloads.
+
+        It runs on this thread's own pooled YoutubeDL: the download worker
+        has moved on to its next job with the instance that downloaded.
+        """
+        job.marks["post_started"] = time.time()
+        try:
+            if self.profiler is not None:
+                self.profiler.begin(job, "post")
+            self._run_posts(job, self.ydl_pool.acquire(job.opts, job))
+        except yt_dlp.utils.PostProcessingError as e:
+            self.ydl_pool.discard(job.opts)
+            job.state = "error"
+            self.journal.update(job)
+            self.progress.post(job, "error")
+            self._emit("error", job, error=f"Postprocessing: {e}")
+        except Exception as e:
+            self.ydl_pool.discard(job.opts)
+            job.state = "error"
+            self.journal.update(job)
+            self.progress.post(job, "error")
+            self._emit("error", job, error=str(e), unexpected=True)
+        else:
+            job.marks["postprocessed"] = time.time()
+            self._finish(job)
+        finally:
+            self._release(job)
+            if self.profiler is not None:
+                self.profiler.end(job, "post")
+                self.profiler.finish(job)
+
+    def _run_posts(self, job: DownloadJob, ydl):
+        """Run the deferred post-processing of ``job`` and archive its media."""
+        while job.post:
+            filename, info, files_to_move = job.post.pop(0)
+            info = ydl.run_post_process(filename, info, files_to_move, job.pp_times)
+            key  = ydl._make_archive_id(info)
+            if key:
+                hashed = info.get("filepath") if self.settings["archive_hash"] else None
+                self.archive.add(key, hashed)
+
+    def _finish(self, job: DownloadJob, skipped: bool = False):
+        job.state, job.pct = "done", 1.0
+        self.journal.update(job)
+        if skipped:
+            self.progress.post(job, "skipped")
+            self._emit("done", job, skipped=True)
+        else:
+            self.progress.post(job, "done")
+            self._emit("done", job)
+
+    def _extract(self, ydl, job: DownloadJob) -> dict:
+        """Unprocessed info for job.url, served from the cache when fresh.
+
+        Format selection and post-processing happen later in
+        process_ie_result, so one cached entry serves every quality and
+        the audio mode alike.
+        """
+        key  = InfoCache.key_for(job.url)
+        info = self.info_cache.get(key)
+        if info is not None:
+            return ydl.sanitize_info(info)
+        info = ydl.extract_info(job.url, download=False, process=False)
+        # Only single videos: playlists and redirects carry lazy entries
+        if info and info.get("_type", "video") == "video":
+            self.info_cache.put(key, ydl.sanitize_info(info, remove_private_keys=True))
+        return info
+
+    def _schedule_retry(self, job: DownloadJob):
+        """Requeue a failed job after a backoff."""
+        delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+        self._requeue(job, delay, "retrying", job.attempts, JOB_RETRIES, delay)
+        self._emit("retry", job, attempt=job.attempts, delay=delay)
+
+    def _requeue(self, job: DownloadJob, delay: float, status: str, *args):
+        """Queue ``job`` again after ``delay`` seconds, without holding a worker."""
+        job.state, job.pct = "queued", 0.0
+        self.journal.update(job)
+        self.progress.post(job, status, *args)
+        timer = threading.Timer(delay, self.queue.submit, args=(job,))
+        timer.daemon = True
+        timer.start()
+
+    def _preflight(self, job: DownloadJob, ydl, info: dict):
+        """Reserve the space the selected formats need before anything is written.
+
+        Raises DiskSpaceError. Merges and audio extraction keep the source
+        next to ffmpeg's output until the end, hence twice the size.
+        """
+        if job is None or os.path.exists(ydl.prepare_filename(info)):
+            return                   # already there: yt-dlp will not download it
+        needed = estimate_bytes(info)
+        if job.is_audio or info.get("requested_formats"):
+            needed *= 2
+        for part in job.parts:       # resumed: those bytes are on disk already
+            try:
+                needed -= os.path.getsize(part)
+            except OSError:
+                pass
+        needed = max(needed, 0) + DISK_MARGIN
+        dev, free = disk_free(job.out_dir)
+        with self._lock:
+            others = sum(n for jid, (d, n) in self._reserved.items()
+                         if d == dev and jid != job.id)
+            if needed > free - others:
+                raise DiskSpaceError(needed, free - others, wait=needed <= free)
+            self._reserved[job.id] = (dev, needed - DISK_MARGIN)
+
+    def _release(self, job: DownloadJob):
+        with self._lock:
+            self._reserved.pop(job.id, None)
+
+    def _expand_job(self, job: DownloadJob) -> bool:
+        """Flat-extract a playlist and queue each entry as its own job.
+
+        Returns False when the URL is a single video, so the caller
+        downloads it directly.
+        """
+        flat = {"extract_flat": "in_playlist", "quiet": True, "no_warnings": True}
+        info = self.ydl_pool.acquire(flat).extract_info(job.url, download=False)
+        if not info or info.get("_type") not in ("playlist", "multi_video"):
+            return False
+
+        children, skipped = [], 0
+        for entry in info.get("entries") or []:
+            if not entry:
+                continue
+            if (self.skip_archived and entry.get("ie_key") and entry.get("id")
+                    and yt_dlp.utils.make_archive_id(entry["ie_key"], entry["id"]) in self.archive):
+                skipped += 1         # before a job, an extraction or a transfer
+                continue
+            url = sanitize_url(entry.get("webpage_url") or entry.get("url") or "")
+            if url:
+                children.append(job.spawn(url, entry.get("title") or ""))
+
+        job.title = info.get("title") or job.url
+        for child in children:
+            self.journal.add(child)     # before "done", so a crash loses no entry
+            self.submit(child, journal=False)
+        job.state, job.pct = "done", 1.0
+        self.journal.update(job)
+        self.progress.post(job, "playlist_n", len(children))
+        self._emit("expanded", job, entries=len(children), skipped=skipped)
+        return True
+
+    def _throttle(self, job: DownloadJob, nbytes: int):
+        if job is not None:
+            self.limiter.consume(job, nbytes)
+
+    def _defer_post(self, job: DownloadJob, ydl, *args):
+        # Run by _run_posts once the job is downloaded; not on ``ydl``, which
+        # goes back to its worker's pool
+        job.post.append(args)
+
+    def _progress_hook(self, job: DownloadJob, d: dict):
+        if job is None:
+            return
+        if job.cancelled:
+            raise yt_dlp.utils.DownloadCancelled("cancelled")
+        status = d.get("status")
+        if status == "downloading" and not d.get("nova_throttled"):
+            # Blocks this download thread while the job is over its share
+            self.limiter.consume_total(job, d.get("tmpfilename") or d.get("filename"),
+                                       d.get("downloaded_bytes") or 0)
+        info   = d.get("info_dict") or {}
+        if info.get("title"):
+            job.title = info["title"]
+        part = d.get("tmpfilename")
+        if part and part not in job.parts:
+            job.parts.add(part)
+            self.journal.update(job, part=part)
+        if status == "downloading":
+            job.rate.update(d.get("downloaded_bytes") or 0,
+                            d.get("total_bytes") or d.get("total_bytes_estimate"),
+                            d.get("speed"))
+            job.pct, job.speed = job.rate.pct, job.rate.speed
+            self.progress.post(job, "downloading")
+
+        elif status == "finished":
+            job.speed  = 0.0
+            job.bytes += d.get("total_bytes") or d.get("downloaded_bytes") or 0
+            self.progress.post(job, "finalizing")
+
+
+# ── Headless CLI ──────────────────────────────────────────────────────────────
+def event_record(event: str, job: DownloadJob = None, info: dict = None) -> dict:
+    """The JSON shape of an engine event, shared by the CLI and the job API."""
+    rec = {"ts": round(time.time(), 3), "event": event}
+    if job is not None:
+        rec.update(job=job.id, uid=job.uid, url=job.url, title=job.title)
+        if job.parent:
+            rec["parent"] = job.parent
+    rec.update(info or {})
+    return rec
+
+
+class JsonLines:
+    """Engine listener that prints one JSON object per event on ``stream``."""
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.errors = 0
+        self._lock  = threading.Lock()
+
+    def __call__(self, event: str, job: DownloadJob = None, info: dict = None):
+        if event in ("error", "engine_error"):
+            self.errors += 1
+        line = json.dumps(event_record(event, job, info), ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def progress(self, job: DownloadJob):
+        self("progress", job, job.progress())
+
+
+def read_url_file(path: str) -> list:
+    """URLs from a text file (or stdin for "-"), one per line; # starts a comment."""
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    with f:
+        return [line.split("#", 1)[0].strip() for line in f if line.split("#", 1)[0].strip()]
+
+
+def run_headless(argv: list = None) -> int:
+    """Download without a window; JSON-lines events on stdout.
+
+    Exit status: 0 when every job finished, 1 when any failed, 2 when
+    nothing could be started.
+    """
+    settings = load_settings(CONFIG_FILE)
+    ap = argparse.ArgumentParser(
+        prog="novastream", description="NovaStream Pro without the GUI: "
+        "downloads the given URLs and prints one JSON event per line.")
+    ap.add_argument("--headless", action="store_true", help="run without the GUI")
+    ap.add_argument("urls", nargs="*", metavar="URL")
+    ap.add_argument("-f", "--file", action="append", default=[],
+                    help="read URLs from a file, one per line ('-' for stdin)")
+    ap.add_argument("-o", "--out", default=os.path.join(os.path.expanduser("~"), "Downloads"),
+                    help="output folder (default: ~/Downloads)")
+    ap.add_argument("-a", "--audio", action="store_true", help="extract audio only")
+    ap.add_argument("--audio-format", default="mp3", choices=AUDIO_FORMATS,
+                    help="with -a: MP3, or the original audio, copied where its codec allows")
+    ap.add_argument("-q", "--quality", default="best", type=lambda s: s.rstrip("p"),
+                    choices=QUALITY_CHOICES, help="maximum video height")
+    ap.add_argument("--subs", default="", help="subtitle languages, comma-separated")
+    ap.add_argument("--batch", action=argparse.BooleanOptionalAction,
+                    default=settings["batch_mode"],
+                    help="expand playlists into one job per entry")
+    ap.add_argument("--policy", choices=POLICIES, default=None,
+                    help="video format choice: best quality, smallest file or a single "
+                         "file without merge (default: from settings)")
+    ap.add_argument("-j", "--workers", type=int, choices=range(1, MAX_WORKERS + 1),
+                    metavar=f"1-{MAX_WORKERS}",
+                    help="parallel downloads (default: the settings file's max_workers)")
+    ap.add_argument("-p", "--priority", default="normal", choices=PRIORITIES,
+                    help="bandwidth share of these jobs under --limit")
+    ap.add_argument("--limit", type=parse_rate, metavar="RATE",
+                    help="bandwidth for all downloads, e.g. 500K or 2M "
+                         "(default: the settings file's rate_limit)")
+    ap.add_argument("--archive", action=argparse.BooleanOptionalAction, default=None,
+                    help="skip media already downloaded (default: from settings)")
+    ap.add_argument("--resume", action="store_true",
+                    help="also re-queue unfinished jobs from the journal")
+    ap.add_argument("--interval", type=float, default=1.0,
+                    help="seconds between progress events per job (default: 1)")
+    ap.add_argument("--metrics-port", type=int, default=settings["metrics_port"], metavar="PORT",
+                    help="serve Prometheus metrics on 127.0.0.1:PORT/metrics while running "
+                         "(default: the settings file's metrics_port, 0 = off)")
+    ap.add_argument("--profile", nargs="?", const=PROFILE_DIR, metavar="DIR",
+                    help="write sampled stacks and tracemalloc dumps per job into a new folder "
+                         f"under DIR (default: {PROFILE_DIR})")
+    ap.add_argument("--api", action="store_true",
+                    help="also serve the job API (api_host/api_port from the "
+                         "settings file) and keep running until interrupted")
+    args = ap.parse_args(argv)
+
+    raw = list(args.urls)
+    try:
+        for path in args.file:
+            raw += read_url_file(path)
+        out_dir = sanitize_path(args.out)
+    except (OSError, ValueError) as e:
+        ap.error(str(e))
+    urls = [sanitize_url(r) for r in raw]
+    if None in urls:
+        ap.error("invalid or unsafe URL: " + raw[urls.index(None)])
+    if not urls and not args.resume and not args.api:
+        ap.error("no URLs given")
+
+    events = JsonLines()
+    engine = DownloadEngine(settings, events, workers=args.workers)
+    if args.limit is not None:
+        engine.limiter.set_rate(args.limit)
+    if args.archive is not None:
+        engine.skip_archived = args.archive
+    if args.policy is not None:
+        engine.format_policy = args.policy
+    if args.profile:
+        engine.profiler = SessionProfiler(args.profile)
+    if engine.profiler is not None:
+        events("profiling", None, {"folder": engine.profiler.folder})
+    if not engine.start():
+        engine.close()
+        return 2
+    api = None
+    if args.api:
+        import novastream_api
+        try:
+            api = novastream_api.start_api(engine, lambda: out_dir)
+        except OSError as e:
+            events("api_error", None, {"error": str(e)})
+            engine.close()
+            return 2
+        events("api", None, dict({"host": api.host, "port": api.port},
+                                 **({"token": api.token} if api.new_token else {})))
+    if args.metrics_port:
+        try:
+            metrics = start_metrics(engine, args.metrics_port)
+        except OSError as e:
+            events("metrics_error", None, {"error": str(e)})
+        else:
+            events("metrics", None, {"port": metrics.port})
+    langs = [lc.strip() for lc in args.subs.split(",") if lc.strip()]
+    if args.resume:
+        engine.resume(engine.unfinished())
+    for url in dict.fromkeys(urls):
+        engine.submit(DownloadJob(url, args.audio, args.quality, langs, out_dir,
+                                  expand=args.batch, priority=args.priority,
+                                  audio_format=args.audio_format))
+
+    last = {}                        # job id → time of its last progress event
+    # Service managers stop us with SIGTERM: treat it like Ctrl-C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while api is not None or engine.busy():
+            time.sleep(1 / PROGRESS_HZ)
+            now = time.monotonic()
+            for job in engine.progress.drain():
+                if job.state == "running" and now - last.get(job.id, 0) >= args.interval:
+                    last[job.id] = now
+                    events.progress(job)
+    except KeyboardInterrupt:
+        # Running jobs stay "running" in the journal; --resume picks them up
+        events("interrupted")
+        if api is not None:
+            api.stop()
+        engine.close()
+        return 130
+    engine.close()
+    return 1 if events.errors else 0
+
+
+def main():
+    sys.exit(run_headless())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+NovaStream Pro - format selection
+Author : Rizinkovic
+
+Picks the formats of a video download from the extracted list instead of a
+yt-dlp format string. Every candidate is scored on its resolution against
+the quality cap, how well its codecs sit in an mp4, its bitrate and the
+bytes it would transfer. A policy decides how those weigh:
+
+    best         highest quality under the cap, mp4-friendly codecs first
+    smallest     fewest bytes that still reach the resolution asked for
+    progressive  one file with audio and video when one reaches that
+                 resolution (no download of two streams, no merge),
+                 else as "best"
+
+FormatPolicy objects are yt-dlp ``format`` callables. Pure Python, no
+yt-dlp import: the functions only read format dicts.
+"""
+
+POLICIES = ["best", "smallest", "progressive"]
+
+# Lower is better: how safely the codec plays from an .mp4 file
+VCODEC_RANK = (("avc1", 0), ("h264", 0), ("hvc1", 1), ("hev1", 1), ("h265", 1),
+               ("av01", 2), ("vp09", 3), ("vp9", 3), ("vp8", 4))
+ACODEC_RANK = (("mp4a", 0), ("aac", 0), ("mp3", 1), ("opus", 2), ("vorbis", 3))
+AUDIO_FLOOR = 96           # kbps: "smallest" takes no audio below this if it can
+
+
+def _rank(codec, table) -> int:
+    codec = (codec or "").lower()
+    for prefix, rank in table:
+        if codec.startswith(prefix):
+            return rank
+    return len(table) + 1
+
+
+def has_video(f: dict) -> bool:
+    return f.get("vcodec") != "none"       # None = unknown, assume it has
+
+
+def has_audio(f: dict) -> bool:
+    return f.get("acodec") != "none"
+
+
+def est_bytes(f: dict) -> float:
+    """Transfer size from filesize / filesize_approx (yt-dlp derives the
+    latter from tbr × duration); infinite when unknown, so a format with
+    a known size always wins."""
+    size = f.get("filesize") or f.get("filesize_approx")
+    return float(size) if size else float("inf")
+
+
+def target_height(videos: list, cap) -> int:
+    """The resolution to aim for: the highest one at or under the cap, or
+    the lowest one available when every format is above it."""
+    heights = {f.get("height") or 0 for f in videos}
+    under = [h for h in heights if cap is None or h <= cap]
+    return max(under) if under else min(heights)
+
+
+def video_score(f: dict) -> tuple:
+    """Sort key for "best": higher is better."""
+    return (f.get("height") or 0, -_rank(f.get("vcodec"), VCODEC_RANK),
+            f.get("fps") or 0, f.get("tbr") or 0, -est_bytes(f))
+
+
+def audio_score(f: dict) -> tuple:
+    return (-_rank(f.get("acodec"), ACODEC_RANK), f.get("abr") or f.get("tbr") or 0,
+            -est_bytes(f))
+
+
+def select(formats: list, quality: str = "best", policy: str = "best") -> list:
+    """The format(s) to download: [progressive] or [video, audio]; [] if none.
+
+    ``quality`` is a height cap as in QUALITY_CHOICES ("best" = none).
+    """
+    cap       = None if quality == "best" else int(quality)
+    videos    = [f for f in formats if has_video(f) and not has_audio(f)]
+    audios    = [f for f in formats if has_audio(f) and not has_video(f)]
+    muxed     = [f for f in formats if has_video(f) and has_audio(f)]
+    if not videos and not muxed:
+        return formats[-1:]          # audio only / nothing known: yt-dlp's order
+    height    = target_height(videos + muxed, cap)
+    in_cap    = lambda f: (f.get("height") or 0) <= max(height, cap or 0)
+    reach     = lambda f: (f.get("height") or 0) >= height
+
+    if policy == "progressive":
+        single = [f for f in muxed if reach(f) and in_cap(f)]
+        if single:
+            return [max(single, key=video_score)]
+        policy = "best"
+
+    if policy == "smallest":
+        options = [[f] for f in muxed if reach(f) and in_cap(f)]
+        if audios:
+            good  = [a for a in audios if (a.get("abr") or 0) >= AUDIO_FLOOR] or audios
+            audio = min(good, key=lambda a: (est_bytes(a), _rank(a.get("acodec"), ACODEC_RANK)))
+            options += [[v, audio] for v in videos if reach(v) and in_cap(v)]
+        if options:
+            return min(options, key=lambda fs: (sum(est_bytes(f) for f in fs),
+                                                sum(_rank(f.get("vcodec"), VCODEC_RANK)
+                                                    for f in fs if has_video(f))))
+
+    # best: the top video under the cap, merged unless a single file is as good
+    pool   = [f for f in videos + muxed if in_cap(f)] or videos + muxed
+    choice = max(pool, key=video_score)
+    if has_audio(choice):
+        return [choice]
+    if not audios:
+        return [choice]              # video only: yt-dlp warns, as with "best"
+    return [choice, max(audios, key=audio_score)]
+
+
+def merged(fmts: list, ext: str) -> dict:
+    """One format dict for a video+audio pair, as yt-dlp builds for "v+a"."""
+    video, audio = fmts
+    known = [s for s in (f.get("filesize") or f.get("filesize_approx") for f in fmts) if s]
+    return {
+        "requested_formats": fmts,
+        "format":          "+".join(f.get("format") or f["format_id"] for f in fmts),
+        "format_id":       "+".join(f["format_id"] for f in fmts),
+        "ext":             ext,
+        "protocol":        "+".join(f.get("protocol") or "https" for f in fmts),
+        "filesize_approx": sum(known) or None,
+        "tbr":             sum(f.get("tbr") or 0 for f in fmts) or None,
+        **{k: video.get(k) for k in ("width", "height", "resolution", "fps", "vcodec",
+                                     "vbr", "dynamic_range", "aspect_ratio")},
+        **{k: audio.get(k) for k in ("acodec", "abr", "asr", "audio_channels")},
+    }
+
+
+class FormatPolicy:
+    """yt-dlp ``format`` callable for one (policy, quality, merge container).
+
+    Its repr is its identity, so equal policies give equal YdlPool keys.
+    """
+
+    def __init__(self, policy: str, quality: str, merge_ext: str):
+        self.policy    = policy
+        self.quality   = quality
+        self.merge_ext = merge_ext
+
+    def __repr__(self) -> str:
+        return f"FormatPolicy({self.policy!r}, {self.quality!r}, {self.merge_ext!r})"
+
+    def __call__(self, ctx: dict):
+        fmts = select(ctx["formats"], self.quality, self.policy)
+        if len(fmts) == 2:
+            yield merged(fmts, self.merge_ext)
+        else:
+            yield from fmts
@@ -0,0 +1,206 @@
+"""
+NovaStream Pro - job metrics
+Author : Rizinkovic
+
+Where the time of a job went. The engine stamps each job as it moves on
+(DownloadJob.marks) and times every post-processor (DownloadJob.pp_times);
+JobMetrics, an engine listener, turns that into one JSON line per finished
+job in the metrics file:
+
+    {"ts", "job", "uid", "url", "title", "outcome", "attempts", "audio",
+     "bytes", "avg_speed",               # bytes/s over the download phase
+     "marks":  {"queued", "started", "extracted", "downloaded",
+                "post_started", "postprocessed", "done"},   # epoch seconds
+     "phases": {"queue", "extract", "download", "post_wait",
+                "postprocess", "total"},                    # seconds
+     "postprocessors": {"Merger": s, "ExtractAudio": s, ...}}
+
+It also keeps process-wide totals, which MetricsServer serves in the
+Prometheus text format on localhost (GET /metrics). Standard library only.
+"""
+
+import http.server
+import json
+import os
+import threading
+import time
+
+# (phase, from mark, to mark); a phase is missing when the job never got there
+PHASES = (
+    ("queue",       "queued",       "started"),
+    ("extract",     "started",      "extracted"),
+    ("download",    "extracted",    "downloaded"),
+    ("post_wait",   "downloaded",   "post_started"),   # behind other ffmpeg runs
+    ("postprocess", "post_started", "postprocessed"),
+    ("total",       "queued",       "done"),
+)
+OUTCOMES = ("done", "skipped", "error", "cancelled")
+BUCKETS  = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)   # seconds
+STATES   = ("queued", "running", "postprocessing")
+
+
+def phase_times(marks: dict) -> dict:
+    """Seconds spent in each PHASES entry both of whose marks are set."""
+    return {name: round(marks[end] - marks[start], 3)
+            for name, start, end in PHASES if start in marks and end in marks}
+
+
+class Histogram:
+    """Cumulative Prometheus histogram of seconds."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)     # the last one is +Inf
+        self.sum    = 0.0
+
+    def observe(self, value: float):
+        for i, le in enumerate(BUCKETS):
+            if value <= le:
+                self.counts[i] += 1
+        self.counts[-1] += 1
+        self.sum += value
+
+    def lines(self, name: str, label: str) -> list:
+        out = [f'{name}_bucket{{{label},le="{le}"}} {n}'
+               for le, n in zip(BUCKETS + ("+Inf",), self.counts)]
+        return out + [f"{name}_sum{{{label}}} {self.sum:.3f}",
+                      f"{name}_count{{{label}}} {self.counts[-1]}"]
+
+
+class JobMetrics:
+    """Engine listener writing one record per finished job.
+
+    ``path`` None keeps the totals for /metrics but writes no file. The
+    file is moved to ``path + ".1"`` once it grows past ``max_bytes``.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = 4 * 1024 * 1024):
+        self.path      = path
+        self.max_bytes = max_bytes
+        self._lock     = threading.Lock()
+        self.jobs      = dict.fromkeys(OUTCOMES, 0)
+        self.bytes     = 0
+        self.phases    = {name: Histogram() for name, _, _ in PHASES}
+        self.pp        = {}          # postprocessor key → Histogram
+
+    def __call__(self, event: str, job, info: dict):
+        if job is None or event not in ("done", "error", "cancelled"):
+            return
+        outcome = "skipped" if info.get("skipped") else event
+        job.marks["done"] = time.time()
+        rec = self.record(job, outcome)
+        if event == "error":
+            rec["error"] = info.get("error")
+        with self._lock:
+            self.jobs[outcome] += 1
+            self.bytes += rec["bytes"]
+            for name, secs in rec["phases"].items():
+                self.phases[name].observe(secs)
+            for key, secs in rec["postprocessors"].items():
+                self.pp.setdefault(key, Histogram()).observe(secs)
+        if self.path:
+            self._append(rec)
+
+    @staticmethod
+    def record(job, outcome: str) -> dict:
+        phases = phase_times(job.marks)
+        pp = {}
+        for key, secs in job.pp_times:
+            pp[key] = round(pp.get(key, 0.0) + secs, 3)
+        dl = phases.get("download")
+        return {
+            "ts":        round(job.marks["done"], 3),
+            "job":       job.id,
+            "uid":       job.uid,
+            "url":       job.url,
+            "title":     job.title,
+            "outcome":   outcome,
+            "attempts":  job.attempts,
+            "audio":     job.audio_format if job.is_audio else None,
+            "bytes":     job.bytes,
+            "avg_speed": round(job.bytes / dl) if dl else None,
+            "marks":     {k: round(v, 3) for k, v in job.marks.items()},
+            "phases":    phases,
+            "postprocessors": pp,
+        }
+
+    def _append(self, rec: dict):
+        line = json.dumps(rec, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+            except OSError:
+                pass                 # not there yet
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError:
+                pass
+
+    def render(self, jobs=()) -> str:
+        """Prometheus text exposition of the totals, plus the current number
+        of ``jobs`` (DownloadJobs) in each unfinished state."""
+        states = dict.fromkeys(STATES, 0)
+        for job in jobs:
+            if job.state in states:
+                states[job.state] += 1
+        out = ["# HELP novastream_jobs_total Jobs finished since start, by outcome.",
+               "# TYPE novastream_jobs_total counter"]
+        with self._lock:
+            out += [f'novastream_jobs_total{{outcome="{k}"}} {n}' for k, n in self.jobs.items()]
+            out += ["# HELP novastream_downloaded_bytes_total Media bytes downloaded by finished jobs.",
+                    "# TYPE novastream_downloaded_bytes_total counter",
+                    f"novastream_downloaded_bytes_total {self.bytes}",
+                    "# HELP novastream_job_phase_seconds Time finished jobs spent per phase.",
+                    "# TYPE novastream_job_phase_seconds histogram"]
+            for name, hist in self.phases.items():
+                out += hist.lines("novastream_job_phase_seconds", f'phase="{name}"')
+            out += ["# HELP novastream_postprocessor_seconds Time per yt-dlp postprocessor run.",
+                    "# TYPE novastream_postprocessor_seconds histogram"]
+            for key, hist in sorted(self.pp.items()):
+                out += hist.lines("novastream_postprocessor_seconds", f'postprocessor="{key}"')
+        out += ["# HELP novastream_jobs Jobs not finished yet, by state.",
+                "# TYPE novastream_jobs gauge"]
+        out += [f'novastream_jobs{{state="{k}"}} {n}' for k, n in states.items()]
+        return "\n".join(out) + "\n"
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        engine = self.server.engine
+        body   = engine.metrics.render(engine.snapshot()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(http.server.ThreadingHTTPServer):
+    """GET /metrics for ``engine``, on 127.0.0.1 only, on a daemon thread."""
+
+    daemon_threads = True
+
+    def __init__(self, engine, port: int):
+        super().__init__(("127.0.0.1", port), MetricsHandler)
+        self.engine = engine
+        self.port   = self.server_port   # when 0 was asked
+
+    def start(self) -> "MetricsServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def start_metrics(engine, port: int) -> MetricsServer:
+    """Serve the engine's metrics; raises OSError if the port cannot be bound."""
+    return MetricsServer(engine, port).start()
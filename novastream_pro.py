@@ -1,5 +1,4 @@
 import customtkinter as ctk
-import yt_dlp
 import threading
 import os
 import sys
@@ -9,7 +8,11 @@ import json
 import math
 import time
 from tkinter import filedialog
-import imageio_ffmpeg
+
+# yt_dlp and imageio_ffmpeg are slow to import; _warm_up() loads them on a
+# background thread after the window is shown
+yt_dlp = None
+imageio_ffmpeg = None
 
 # DPI awareness prevents blurry text on high-res monitors
 try:
@@ -20,6 +23,12 @@ except:
 
 CONFIG_FILE = os.path.join(os.path.expanduser("~"), ".novastream_settings.json")
 
+def _warm_up():
+    global yt_dlp, imageio_ffmpeg
+    import yt_dlp
+    import yt_dlp.utils
+    import imageio_ffmpeg
+
 def get_resource_path(relative_path):
     try:
         base_path = sys._MEIPASS
@@ -102,6 +111,17 @@ class NovaStreamPro(ctk.CTk):
         self._build_footer()
 
         self._start_wave_loop()
+        self.after_idle(lambda: threading.Thread(target=self._warm_up_bg, daemon=True).start())
+
+    def _warm_up_bg(self):
+        try:
+            _warm_up()
+        except Exception as e:
+            msg = f"✘  Could not load yt-dlp: {e}"     # e is unbound after the block
+            self.after(0, lambda: self._log(msg))
+            return
+        self.after(0, lambda: self.download_btn.configure(
+            text="▶  DOWNLOAD NOW", state="normal"))
 
     # ── Settings persistence ──────────────────────────────────────────────────
     def _load_settings(self):
@@ -270,7 +290,7 @@ class NovaStreamPro(ctk.CTk):
         self.quality_menu.grid(row=2, column=0, pady=4)
 
         self.download_btn = ctk.CTkButton(
-            self.main, text="▶  DOWNLOAD NOW",
+            self.main, text="Loading engine…", state="disabled",
             font=("Arial", 15, "bold"),
             height=52,
             fg_color=self._pal["accent"],
@@ -500,10 +520,12 @@ class NovaStreamPro(ctk.CTk):
             if self.settings["auto_open"]:
                 self.after(500, self.open_folder)
         except yt_dlp.utils.DownloadError as e:
-            self.after(0, lambda: self._log(f"✘  Download error: {e}"))
+            msg = f"✘  Download error: {e}"
+            self.after(0, lambda: self._log(msg))
             self.after(0, lambda: self.progress_label.configure(text="Error"))
         except Exception as e:
-            self.after(0, lambda: self._log(f"✘  Unexpected error: {e}"))
+            msg = f"✘  Unexpected error: {e}"
+            self.after(0, lambda: self._log(msg))
             self.after(0, lambda: self.progress_label.configure(text="Error"))
         finally:
             self._wave_speed = 0.0
@@ -5,19 +5,25 @@ Security : URL validation, path sanitization, no shell injection, sandboxed yt-d
 """
 
 import customtkinter as ctk
-import yt_dlp
 import threading
+import collections
 import os
 import sys
 import re
 import subprocess
 import webbrowser
-import json
 import math
 import time
-from urllib.parse import urlparse
-from tkinter import filedialog
-import imageio_ffmpeg
+from tkinter import filedialog, messagebox
+
+from novastream_engine import (
+    CONFIG_FILE, LOG_FILE, MAX_WORKERS, CONNECTION_CHOICES, RATE_CHOICES,
+    PRIORITIES, POLICIES, PROGRESS_HZ, ENGINE_READY, DEFAULT_SETTINGS, sanitize_url, sanitize_path,
+    log, setup_file_log, flush_file_log, close_file_log, read_full_log, load_settings, format_size, format_rate, format_eta,
+    DownloadJob, DownloadEngine, run_headless,
+)
+from novastream_metrics import start_metrics
+from novastream_profile import UI_DUMP
 
 # ── DPI awareness (Windows) ──────────────────────────────────────────────────
 try:
@@ -27,15 +33,18 @@ except Exception:
     pass
 
 # ── Constants ────────────────────────────────────────────────────────────────
-CONFIG_FILE  = os.path.join(os.path.expanduser("~"), ".novastream_settings.json")
 FONT_MONO    = "Courier New"
 FONT_SM      = 11
 FONT_MD      = 13
 FONT_LG      = 15
 FONT_XL      = 20
 
-# ── Security: allowed URL schemes ────────────────────────────────────────────
-ALLOWED_SCHEMES = {"http", "https"}
+WAVE_FPS     = 33          # while downloading in the focused window
+WAVE_FPS_BG  = 10          # while downloading, window unfocused
+WAVE_FPS_IDLE = 4          # nothing running; hidden windows pause entirely
+WAVE_BUDGET  = 0.008       # seconds a frame may take before frames are dropped
+LOG_MAX_LINES = 500        # lines kept in the log view; the file keeps everything
+FULL_LOG_SLICE = 2000      # lines of the full log inserted per event-loop turn
 
 # ── Palettes ─────────────────────────────────────────────────────────────────
 PALETTES = {
@@ -84,6 +93,7 @@ STRINGS = {
         "select_folder": "⊕  Select Folder",
         "saving_to":     "Saving to:\n{}",
         "open_folder":   "📂  Open Folder",
+        "full_log":      "📄  Show Full Log",
         "sub_en":        "English",
         "sub_fr":        "French",
         "theme_lbl":     "Theme",
@@ -95,21 +105,61 @@ STRINGS = {
         "lang_lbl":      "Language",
         "auto_open":     "Auto-open folder",
         "show_speed":    "Show speed",
+        "workers_lbl":   "Parallel downloads",
+        "conn_lbl":      "Connections per download",
+        "policy_lbl":    "Video format choice",
+        "policy_vals":   ["Best quality", "Smallest file", "Single file (no merge)"],
+        "limit_lbl":     "Bandwidth limit (all downloads)",
+        "limit_none":    "Unlimited",
+        "prio_vals":     ["High priority", "Normal priority", "Background"],
+        "batch_mode":    "Playlist / batch",
+        "api_toggle":    "Remote job API",
+        "skip_archived": "Skip already downloaded",
         "mode_video":    "🎬  Video",
         "mode_audio":    "🎵  Audio (MP3)",
+        "mode_original": "🎵  Audio (original)",
         "dl_btn":        "▶  DOWNLOAD NOW",
+        "engine_loading":"Loading engine…",
         "ready":         "Ready",
         "speed_idle":    "Speed: —",
         "starting":      "Starting…",
+        "queued":        "Queued",
+        "expanding":     "Reading playlist…",
+        "playlist_n":    "Playlist: {} entries",
+        "retrying":      "Retry {}/{} in {}s…",
+        "overview":      "Active: {}  ·  Queued: {}",
         "downloading":   "Downloading:  {}%",
+        "eta":           "ETA {}",
         "finalizing":    "Finalizing…",
+        "postprocessing":"Converting…",
         "done":          "Done ✔",
         "error":         "Error",
-        "log_success":   "✔  Download complete!",
-        "log_dl_err":    "✘  Download error: {}",
+        "cancelled":     "Cancelled",
+        "skipped":       "Already downloaded",
+        "waiting_space": "Waiting for disk space…",
+        "log_success":   "✔  Download complete: {}",
+        "log_dl_err":    "✘  Download error ({}): {}",
         "log_err":       "✘  Unexpected error: {}",
+        "log_engine_err":"✘  Could not load yt-dlp: {}",
+        "log_ffmpeg":    "ffmpeg {} ({} encoders, {} muxers)",
+        "log_ffmpeg_err":"⚠  ffmpeg unavailable, merging and MP3 conversion will fail: {}",
         "log_folder_err":"Cannot open folder: {}",
         "log_url_bad":   "✘  Invalid or unsafe URL. Only http/https links are accepted.",
+        "log_batch":     "⊕  Queued {} entries from {}",
+        "resume_title":  "Resume downloads",
+        "resume_ask":    "{} download(s) did not finish last time.\nResume them now?",
+        "log_resumed":   "↻  Resuming {} download(s) from last session",
+        "log_cancelled": "⊘  Cancelled: {}",
+        "log_skipped":   "⊘  Already downloaded: {}",
+        "log_batch_skip":"⊘  Skipped {} entries already downloaded",
+        "log_wait_space":"⏸  Not enough disk space yet ({} needed, {} free): {}",
+        "log_no_mp3":    "⚠  This ffmpeg has no MP3 encoder, keeping the original audio: {}",
+        "log_api":       "⇄  Job API listening on http://{}:{}",
+        "log_api_err":   "✘  Job API could not start: {}",
+        "log_api_token": "⇄  New job API token (kept in the settings file): {}",
+        "log_metrics":   "⇄  Metrics at http://127.0.0.1:{}/metrics",
+        "log_metrics_err":"✘  Metrics endpoint could not start: {}",
+        "log_profile":   "⏱  Profiling this session into {}",
         "footer":        "Made by Rizinkovic",
     },
     "fr": {
@@ -121,6 +171,7 @@ STRINGS = {
         "select_folder": "⊕  Choisir un dossier",
         "saving_to":     "Enregistrer dans :\n{}",
         "open_folder":   "📂  Ouvrir le dossier",
+        "full_log":      "📄  Journal complet",
         "sub_en":        "Anglais",
         "sub_fr":        "Français",
         "theme_lbl":     "Thème",
@@ -132,33 +183,67 @@ STRINGS = {
         "lang_lbl":      "Langue",
         "auto_open":     "Ouvrir le dossier auto.",
         "show_speed":    "Afficher la vitesse",
+        "workers_lbl":   "Téléchargements parallèles",
+        "conn_lbl":      "Connexions par téléchargement",
+        "policy_lbl":    "Choix du format vidéo",
+        "policy_vals":   ["Meilleure qualité", "Fichier le plus léger", "Fichier unique (sans fusion)"],
+        "limit_lbl":     "Débit maximal (tous)",
+        "limit_none":    "Illimité",
+        "prio_vals":     ["Priorité haute", "Priorité normale", "Arrière-plan"],
+        "batch_mode":    "Playlist / lot",
+        "api_toggle":    "API de tâches distante",
+        "skip_archived": "Ignorer les déjà téléchargés",
         "mode_video":    "🎬  Vidéo",
         "mode_audio":    "🎵  Audio (MP3)",
+        "mode_original": "🎵  Audio (originale)",
         "dl_btn":        "▶  TÉLÉCHARGER",
+        "engine_loading":"Chargement du moteur…",
         "ready":         "Prêt",
         "speed_idle":    "Vitesse : —",
         "starting":      "Démarrage…",
+        "queued":        "En attente",
+        "expanding":     "Lecture de la playlist…",
+        "playlist_n":    "Playlist : {} éléments",
+        "retrying":      "Nouvel essai {}/{} dans {}s…",
+        "overview":      "En cours : {}  ·  En attente : {}",
         "downloading":   "Téléchargement :  {}%",
+        "eta":           "reste {}",
         "finalizing":    "Finalisation…",
+        "postprocessing":"Conversion…",
         "done":          "Terminé ✔",
         "error":         "Erreur",
-        "log_success":   "✔  Téléchargement terminé !",
-        "log_dl_err":    "✘  Erreur de téléchargement : {}",
+        "cancelled":     "Annulé",
+        "skipped":       "Déjà téléchargé",
+        "waiting_space": "En attente d'espace disque…",
+        "log_success":   "✔  Téléchargement terminé : {}",
+        "log_dl_err":    "✘  Erreur de téléchargement ({}) : {}",
         "log_err":       "✘  Erreur inattendue : {}",
+        "log_engine_err":"✘  Impossible de charger yt-dlp : {}",
+        "log_ffmpeg":    "ffmpeg {} ({} encodeurs, {} muxeurs)",
+        "log_ffmpeg_err":"⚠  ffmpeg indisponible, la fusion et la conversion MP3 échoueront : {}",
         "log_folder_err":"Impossible d'ouvrir le dossier : {}",
         "log_url_bad":   "✘  URL invalide ou dangereuse. Seuls les liens http/https sont acceptés.",
+        "log_batch":     "⊕  {} éléments ajoutés depuis {}",
+        "resume_title":  "Reprendre les téléchargements",
+        "resume_ask":    "{} téléchargement(s) n'ont pas abouti la dernière fois.\nLes reprendre maintenant ?",
+        "log_resumed":   "↻  Reprise de {} téléchargement(s) de la session précédente",
+        "log_cancelled": "⊘  Annulé : {}",
+        "log_skipped":   "⊘  Déjà téléchargé : {}",
+        "log_batch_skip":"⊘  {} éléments déjà téléchargés ignorés",
+        "log_wait_space":"⏸  Espace disque insuffisant pour l'instant ({} requis, {} libres) : {}",
+        "log_no_mp3":    "⚠  Ce ffmpeg n'a pas d'encodeur MP3, l'audio d'origine est conservé : {}",
+        "log_api":       "⇄  API de tâches à l'écoute sur http://{}:{}",
+        "log_api_err":   "✘  Impossible de démarrer l'API de tâches : {}",
+        "log_api_token": "⇄  Nouveau jeton de l'API de tâches (gardé dans les réglages) : {}",
+        "log_metrics":   "⇄  Métriques sur http://127.0.0.1:{}/metrics",
+        "log_metrics_err":"✘  Impossible de démarrer le point de métriques : {}",
+        "log_profile":   "⏱  Profilage de cette session dans {}",
         "footer":        "Fait par Rizinkovic",
     },
 }
 
-DEFAULT_SETTINGS = {
-    "theme":       "dark",
-    "palette":     "blueish-white",
-    "auto_open":   False,
-    "show_speed":  True,
-    "mp3_quality": "128",
-    "language":    "en",
-}
+# Segments of the mode switch, in display order
+MODE_KEYS = ("mode_video", "mode_audio", "mode_original")
 
 # Map every possible MP3 label (both languages) → kbps string
 MP3_LABEL_TO_KBPS = {
@@ -169,30 +254,6 @@ MP3_LABEL_TO_KBPS = {
 }
 
 
-# ── Security helpers ──────────────────────────────────────────────────────────
-def sanitize_url(raw: str):
-    """Return cleaned URL string, or None if unsafe/invalid."""
-    url = raw.strip()
-    if re.search(r'[;&|`$<>\'"\\]', url):
-        return None
-    try:
-        p = urlparse(url)
-    except Exception:
-        return None
-    if p.scheme not in ALLOWED_SCHEMES:
-        return None
-    if not p.netloc:
-        return None
-    return url
-
-
-def sanitize_path(path: str) -> str:
-    """Resolve and expand path; raise ValueError on null bytes."""
-    if "\x00" in path:
-        raise ValueError("Null byte in path")
-    return os.path.realpath(os.path.expanduser(path))
-
-
 def get_resource_path(relative_path: str) -> str:
     try:
         base = sys._MEIPASS  # type: ignore[attr-defined]
@@ -201,6 +262,171 @@ def get_resource_path(relative_path: str) -> str:
     return os.path.join(base, relative_path)
 
 
+# ── Wave renderer ─────────────────────────────────────────────────────────────
+# (amplitude factor, spatial freq, time speed, palette colour, line width, phase)
+WAVE_IDLE   = (1.00, 0.018, 0.8, "wave2", 1, 0.0)
+WAVE_ACTIVE = ((0.50, 0.022, 3.5, "wave2", 1, 0.0),
+               (0.85, 0.015, 2.2, "wave1", 2, 1.1),
+               (0.40, 0.036, 5.0, "wave3", 1, 2.5))
+
+
+class WaveRenderer:
+    """Retained-mode sine waves on a canvas.
+
+    The line items are created once and moved with ``coords``. sin(kx) and
+    cos(kx) are tabulated per x position whenever the canvas is resized, so
+    a frame needs one sin/cos pair per layer and then just
+    y = cy + a·(sin kx·cos θ + cos kx·sin θ) for every point.
+    """
+
+    def __init__(self, canvas, palette: dict):
+        self.canvas  = canvas
+        self._w      = 0
+        self._cy     = 0.0
+        self._active = None
+        self._layers = []
+        for spec in (WAVE_IDLE,) + WAVE_ACTIVE:
+            item = canvas.create_line(0, 0, 0, 0, smooth=True, width=spec[4],
+                                      fill=palette[spec[3]], state="hidden")
+            self._layers.append({"spec": spec, "item": item,
+                                 "sin": [], "cos": [], "coords": []})
+        canvas.bind("<Configure>", lambda e: self.resize(e.width, e.height), add="+")
+
+    def resize(self, w: int, h: int):
+        self._w, self._cy = w, h / 2
+        step = max(3, w // 130)
+        xs   = list(range(0, w + step, step))
+        for layer in self._layers:
+            k = layer["spec"][1]
+            layer["sin"] = [math.sin(x * k) for x in xs]
+            layer["cos"] = [math.cos(x * k) for x in xs]
+            coords = [0.0] * (2 * len(xs))
+            coords[0::2] = xs
+            layer["coords"] = coords
+
+    def recolor(self, palette: dict):
+        for layer in self._layers:
+            self.canvas.itemconfigure(layer["item"], fill=palette[layer["spec"][3]])
+
+    def draw(self, t: float, speed: float):
+        if self._w < 10:
+            return
+        active = speed > 0
+        if active != self._active:
+            self._active = active
+            for i, layer in enumerate(self._layers):
+                shown = (i > 0) == active
+                self.canvas.itemconfigure(layer["item"],
+                                          state="normal" if shown else "hidden")
+        amp    = min(36, 6 + speed * 3.2) if active else 5
+        layers = self._layers[1:] if active else self._layers[:1]
+        cy     = self._cy
+        for layer in layers:
+            fac, _, sp, _, _, phase = layer["spec"]
+            theta = t * sp + phase
+            ka = amp * fac * math.cos(theta)
+            kb = amp * fac * math.sin(theta)
+            coords = layer["coords"]
+            coords[1::2] = [cy + ka * s + kb * c
+                            for s, c in zip(layer["sin"], layer["cos"])]
+            self.canvas.coords(layer["item"], coords)
+
+
+class FrameScheduler:
+    """Runs a Tk animation callback at a rate that follows the app state.
+
+    ``rate_fn()`` is asked for the wanted frames per second before every
+    frame; 0 pauses the loop until ``wake()``. A frame that takes longer
+    than ``budget`` seconds makes the scheduler drop the following frames
+    in proportion to the overrun, so the animation yields to real work.
+    """
+
+    MAX_SKIP = 10
+
+    def __init__(self, widget, draw, rate_fn, budget: float):
+        self.widget   = widget
+        self.draw     = draw
+        self.rate_fn  = rate_fn
+        self.budget   = budget
+        self._after   = None
+        self._stopped = False
+        self.frames   = 0
+        self.skipped  = 0
+        self.last_s   = 0.0
+        self.max_s    = 0.0
+        self.total_s  = 0.0
+        self.fps      = 0
+
+    def wake(self):
+        if self._after is None and not self._stopped:
+            self._after = self.widget.after_idle(self._tick)
+
+    def stop(self):
+        self._stopped = True
+        if self._after is not None:
+            try:
+                self.widget.after_cancel(self._after)
+            except Exception:
+                pass
+            self._after = None
+
+    def stats(self) -> dict:
+        return {
+            "frames":     self.frames,
+            "skipped":    self.skipped,
+            "target_fps": self.fps,
+            "last_ms":    round(self.last_s * 1000, 3),
+            "avg_ms":     round(self.total_s * 1000 / self.frames, 3) if self.frames else 0.0,
+            "max_ms":     round(self.max_s * 1000, 3),
+        }
+
+    def _tick(self):
+        self._after = None
+        if self._stopped:
+            return
+        self.fps = self.rate_fn()
+        if self.fps <= 0:
+            return                   # paused; wake() restarts the loop
+        t0 = time.perf_counter()
+        try:
+            self.draw()
+        except Exception:
+            pass
+        dt = time.perf_counter() - t0
+        self.frames  += 1
+        self.last_s   = dt
+        self.total_s += dt
+        self.max_s    = max(self.max_s, dt)
+        interval = 1.0 / self.fps
+        if dt > self.budget:
+            skip = min(self.MAX_SKIP, math.ceil(dt / self.budget))
+            self.skipped += skip
+            interval *= skip + 1
+        self._after = self.widget.after(max(1, int(interval * 1000)), self._tick)
+
+
+class JobRow(ctk.CTkFrame):
+    """Title, progress bar and status line for one job in the queue panel."""
+
+    def __init__(self, master, title: str, status: str, accent: str):
+        super().__init__(master, fg_color="transparent")
+        self.grid_columnconfigure(0, weight=1)
+        self.title_lbl = ctk.CTkLabel(self, text=title, font=(FONT_MONO, FONT_SM),
+                                      anchor="w")
+        self.title_lbl.grid(row=0, column=0, sticky="ew")
+        self.status_lbl = ctk.CTkLabel(self, text=status, font=(FONT_MONO, FONT_SM),
+                                       text_color="gray", anchor="e")
+        self.status_lbl.grid(row=0, column=1, sticky="e", padx=(8, 0))
+        self.bar = ctk.CTkProgressBar(self, progress_color=accent, height=8)
+        self.bar.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(0, 6))
+        self.bar.set(0)
+
+    def update_job(self, title: str, pct: float, status: str):
+        self.title_lbl.configure(text=title[:70])
+        self.bar.set(pct)
+        self.status_lbl.configure(text=status)
+
+
 # ── App ───────────────────────────────────────────────────────────────────────
 class NovaStreamPro(ctk.CTk):
 
@@ -209,6 +435,12 @@ class NovaStreamPro(ctk.CTk):
 
         # Load settings & active translation
         self.settings   = self._load_settings()
+        self.engine     = DownloadEngine(
+            self.settings, lambda ev, job, info: self.after(0, self._on_engine_event, ev, job, info))
+        if not log.handlers:
+            setup_file_log(LOG_FILE)
+        self._log_pending = collections.deque()   # filled from any thread
+        self._log_lines   = 0
         self._pal       = PALETTES[self.settings["palette"]]
         self._lang      = self.settings["language"]
         self._t         = STRINGS[self._lang]
@@ -226,12 +458,15 @@ class NovaStreamPro(ctk.CTk):
                 pass
 
         self.title(self._t["title"])
-        self.geometry("980x710")
-        self.minsize(820, 600)
+        self.geometry("980x820")
+        self.minsize(820, 680)
 
         self.download_path = os.path.join(os.path.expanduser("~"), "Downloads")
         self._wave_speed   = 0.0
         self._anim_running = True
+        self._job_rows     = {}      # job id → JobRow
+        self._api          = None    # novastream_api.ApiServer while enabled
+        self._metrics      = None    # novastream_metrics.MetricsServer, per metrics_port
 
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(0, weight=1)
@@ -240,6 +475,18 @@ class NovaStreamPro(ctk.CTk):
         self._build_main()
         self._build_footer()
         self._start_wave_loop()
+        self._progress_tick()
+        if self.settings["api_enabled"]:
+            self._start_api()
+        if self.settings["metrics_port"]:
+            self._start_metrics()
+        if self.engine.profiler is not None:
+            self.engine.profiler.ui_begin()
+            self.after(UI_DUMP * 1000, self._profile_tick)
+            self._log(self._("log_profile", self.engine.profiler.folder))
+        self.after(400, self._offer_resume)
+        # Only once the first frame has been drawn
+        self.after_idle(lambda: threading.Thread(target=self.engine.start, daemon=True).start())
 
     # ── Translate shortcut ────────────────────────────────────────────────────
     def _(self, key: str, *args) -> str:
@@ -248,28 +495,15 @@ class NovaStreamPro(ctk.CTk):
 
     # ── Settings I/O ─────────────────────────────────────────────────────────
     def _load_settings(self) -> dict:
-        if os.path.exists(CONFIG_FILE):
-            try:
-                with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                if not isinstance(data, dict):
-                    raise ValueError("corrupt")
-                for k, v in DEFAULT_SETTINGS.items():
-                    data.setdefault(k, v)
-                # Guard unknowns
-                if data["palette"]  not in PALETTES: data["palette"]  = DEFAULT_SETTINGS["palette"]
-                if data["language"] not in STRINGS:  data["language"] = DEFAULT_SETTINGS["language"]
-                return data
-            except Exception:
-                pass
-        return dict(DEFAULT_SETTINGS)
+        data = load_settings(CONFIG_FILE)
+        # Guard unknowns (the engine checks its own keys)
+        if data["palette"]  not in PALETTES: data["palette"]  = DEFAULT_SETTINGS["palette"]
+        if data["language"] not in STRINGS:  data["language"] = DEFAULT_SETTINGS["language"]
+        return data
 
     def _save_settings(self):
-        try:
-            with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.settings, f, indent=2, ensure_ascii=False)
-        except Exception:
-            pass
+        """Queue a write; rapid changes coalesce into one, off the Tk thread."""
+        self.engine.save_settings()
 
     # ── Widget style helpers ──────────────────────────────────────────────────
     def _accent(self) -> dict:
@@ -333,6 +567,13 @@ class NovaStreamPro(ctk.CTk):
         )
         self.open_btn.pack(pady=5, padx=18, fill="x")
 
+        self.log_btn = ctk.CTkButton(
+            self.sidebar, text=self._("full_log"),
+            font=(FONT_MONO, FONT_SM), **self._outline(),
+            command=self.show_full_log,
+        )
+        self.log_btn.pack(pady=5, padx=18, fill="x")
+
         # ── Subtitles ─────────────────────────────────────────────────────────
         self._sec_subs = self._sb_divider("sec_subtitles")
 
@@ -397,6 +638,45 @@ class NovaStreamPro(ctk.CTk):
         self.lang_opt.set("English" if self.settings["language"] == "en" else "Français")
         self.lang_opt.pack(pady=(2, 8), padx=18, fill="x")
 
+        # Parallel downloads
+        self.workers_lbl_w = self._sb_label("workers_lbl")
+        self.workers_opt = ctk.CTkOptionMenu(
+            self.sidebar, values=[str(n) for n in range(1, MAX_WORKERS + 1)],
+            font=(FONT_MONO, FONT_SM),
+            command=self._on_workers_change,
+        )
+        self.workers_opt.set(str(self.settings["max_workers"]))
+        self.workers_opt.pack(pady=(2, 8), padx=18, fill="x")
+
+        # Connections per download
+        self.conn_lbl_w = self._sb_label("conn_lbl")
+        self.conn_opt = ctk.CTkOptionMenu(
+            self.sidebar, values=CONNECTION_CHOICES,
+            font=(FONT_MONO, FONT_SM),
+            command=self._on_connections_change,
+        )
+        self.conn_opt.set(str(self.settings["connections"]))
+        self.conn_opt.pack(pady=(2, 8), padx=18, fill="x")
+
+        # Format selection policy
+        self.policy_lbl_w = self._sb_label("policy_lbl")
+        self.policy_opt = ctk.CTkOptionMenu(
+            self.sidebar, values=self._("policy_vals"),
+            font=(FONT_MONO, FONT_SM),
+            command=self._on_policy_change,
+        )
+        self.policy_opt.set(self._("policy_vals")[POLICIES.index(self.settings["format_policy"])])
+        self.policy_opt.pack(pady=(2, 8), padx=18, fill="x")
+
+        self.limit_lbl_w = self._sb_label("limit_lbl")
+        self.limit_opt = ctk.CTkOptionMenu(
+            self.sidebar, values=self._limit_labels(),
+            font=(FONT_MONO, FONT_SM),
+            command=self._on_limit_change,
+        )
+        self.limit_opt.set(self._limit_label(self.settings["rate_limit"]))
+        self.limit_opt.pack(pady=(2, 8), padx=18, fill="x")
+
         # Toggles
         self.auto_open_cb = ctk.CTkCheckBox(
             self.sidebar, text=self._("auto_open"),
@@ -416,12 +696,32 @@ class NovaStreamPro(ctk.CTk):
             self.show_speed_cb.select()
         self.show_speed_cb.pack(pady=3, padx=18, anchor="w")
 
+        self.archive_cb = ctk.CTkCheckBox(
+            self.sidebar, text=self._("skip_archived"),
+            font=(FONT_MONO, FONT_SM), **self._chk(),
+            command=self._on_archive_toggle,
+        )
+        if self.settings["skip_archived"]:
+            self.archive_cb.select()
+        self.archive_cb.pack(pady=3, padx=18, anchor="w")
+
+        self.api_cb = ctk.CTkCheckBox(
+            self.sidebar, text=self._("api_toggle"),
+            font=(FONT_MONO, FONT_SM), **self._chk(),
+            command=self._on_api_toggle,
+        )
+        if self.settings["api_enabled"]:
+            self.api_cb.select()
+        self.api_cb.pack(pady=3, padx=18, anchor="w")
+
         # Collect refs for full palette refresh
         self._accent_btns  = [self.sel_btn]
-        self._outline_btns = [self.open_btn]
-        self._checkboxes   = [self.sub_en, self.sub_fr_cb, self.auto_open_cb, self.show_speed_cb]
+        self._outline_btns = [self.open_btn, self.log_btn]
+        self._checkboxes   = [self.sub_en, self.sub_fr_cb, self.auto_open_cb, self.show_speed_cb,
+                              self.archive_cb, self.api_cb]
         self._optionmenus  = [self.theme_opt, self.palette_opt, self.mp3_opt,
-                               self.lang_opt]
+                               self.lang_opt, self.workers_opt, self.conn_opt, self.policy_opt,
+                               self.limit_opt]
 
     def _sb_divider(self, key: str) -> ctk.CTkLabel:
         ctk.CTkFrame(self.sidebar, height=1, fg_color="gray30").pack(
@@ -451,32 +751,53 @@ class NovaStreamPro(ctk.CTk):
 
         self.url_entry = ctk.CTkEntry(
             self.main,
-            placeholder_text="🔗  https://youtube.com/watch?v=...",
+            placeholder_text="🔗  https://youtube.com/watch?v=...  (paste several links or a playlist)",
             height=52, font=(FONT_MONO, FONT_MD),
         )
         self.url_entry.grid(row=0, column=0, sticky="ew", pady=(6, 8))
 
         self.mode_switch = ctk.CTkSegmentedButton(
             self.main,
-            values=[self._("mode_video"), self._("mode_audio")],
+            values=[self._(k) for k in MODE_KEYS],
             height=42, font=(FONT_MONO, FONT_MD),
             command=self._on_mode_change,
         )
         self.mode_switch.set(self._("mode_video"))
         self.mode_switch.grid(row=1, column=0, sticky="ew", pady=4)
 
+        self.opts_row = ctk.CTkFrame(self.main, fg_color="transparent")
+        self.opts_row.grid(row=2, column=0, pady=4)
+
         self.quality_menu = ctk.CTkOptionMenu(
-            self.main,
+            self.opts_row,
             values=["best", "1080p", "720p", "480p", "360p", "240p"],
             height=40, font=(FONT_MONO, FONT_MD),
         )
         self.quality_menu.set("best")
-        self.quality_menu.grid(row=2, column=0, pady=4)
+        self.quality_menu.pack(side="left")
 
+        self.prio_menu = ctk.CTkOptionMenu(
+            self.opts_row, values=self._("prio_vals"),
+            height=40, font=(FONT_MONO, FONT_MD),
+        )
+        self.prio_menu.set(self._("prio_vals")[1])
+        self.prio_menu.pack(side="left", padx=(16, 0))
+
+        self.batch_cb = ctk.CTkCheckBox(
+            self.opts_row, text=self._("batch_mode"),
+            font=(FONT_MONO, FONT_SM), **self._chk(),
+            command=self._on_batch_toggle,
+        )
+        if self.settings["batch_mode"]:
+            self.batch_cb.select()
+        self.batch_cb.pack(side="left", padx=(16, 0))
+
+        ready = ENGINE_READY.is_set()
         self.download_btn = ctk.CTkButton(
-            self.main, text=self._("dl_btn"),
+            self.main, text=self._("dl_btn" if ready else "engine_loading"),
             font=(FONT_MONO, FONT_LG, "bold"),
             height=56, **self._accent(),
+            state="normal" if ready else "disabled",
             command=self.start_thread,
         )
         self.download_btn.grid(row=3, column=0, sticky="ew", pady=14)
@@ -506,11 +827,16 @@ class NovaStreamPro(ctk.CTk):
         )
         self.canvas.grid(row=7, column=0, sticky="ew", pady=8)
 
+        self.jobs_frame = ctk.CTkScrollableFrame(self.main, height=120)
+        self.jobs_frame.grid(row=8, column=0, sticky="nsew", pady=(4, 4))
+        self.jobs_frame.grid_columnconfigure(0, weight=1)
+        self.main.grid_rowconfigure(8, weight=1)
+
         self.log_box = ctk.CTkTextbox(
-            self.main, height=130, font=(FONT_MONO, FONT_SM),
+            self.main, height=110, font=(FONT_MONO, FONT_SM),
         )
-        self.log_box.grid(row=8, column=0, sticky="nsew", pady=(4, 0))
-        self.main.grid_rowconfigure(8, weight=1)
+        self.log_box.grid(row=9, column=0, sticky="nsew", pady=(4, 0))
+        self.main.grid_rowconfigure(9, weight=1)
 
     def _build_footer(self):
         self.footer = ctk.CTkLabel(
@@ -524,49 +850,39 @@ class NovaStreamPro(ctk.CTk):
 
     # ── Wave animation ────────────────────────────────────────────────────────
     def _start_wave_loop(self):
-        self._draw_wave()
+        self._wave = WaveRenderer(self.canvas, self._pal)
+        self._wave_sched = FrameScheduler(self, self._draw_wave, self._wave_fps,
+                                          WAVE_BUDGET)
+        for seq in ("<Map>", "<FocusIn>"):
+            self.bind(seq, lambda e: self._wave_sched.wake(), add="+")
+        self._wave_sched.wake()
 
     def _draw_wave(self):
-        if not self._anim_running:
-            return
+        self._wave.draw(time.monotonic(), self._wave_speed)
+
+    def _wave_fps(self) -> int:
+        """Frame rate for the wave: full only while downloading in view."""
         try:
-            self.canvas.delete("all")
-            w = self.canvas.winfo_width()
-            h = self.canvas.winfo_height()
-            if w < 10 or h < 10:
-                self.after(50, self._draw_wave)
-                return
-            t = time.monotonic()
-            s = self._wave_speed
-            if s <= 0:
-                self._wave_line(w, h, t, amp=5,        freq=0.018, sp=0.8,
-                                color=self._pal["wave2"], lw=1)
-            else:
-                amp = min(36, 6 + s * 3.2)
-                self._wave_line(w, h, t, amp * 0.50, 0.022, 3.5,
-                                self._pal["wave2"], lw=1)
-                self._wave_line(w, h, t, amp * 0.85, 0.015, 2.2,
-                                self._pal["wave1"], lw=2, phase=1.1)
-                self._wave_line(w, h, t, amp * 0.40, 0.036, 5.0,
-                                self._pal["wave3"], lw=1, phase=2.5)
+            if self.state() in ("iconic", "withdrawn") or not self.canvas.winfo_viewable():
+                return 0
+            if self._wave_speed <= 0:
+                return WAVE_FPS_IDLE
+            return WAVE_FPS if self.focus_displayof() is not None else WAVE_FPS_BG
         except Exception:
-            pass
-        self.after(30, self._draw_wave)
+            return WAVE_FPS_IDLE
 
-    def _wave_line(self, w, h, t, amp, freq, sp, color, lw, phase=0.0):
-        cy   = h / 2
-        step = max(3, w // 130)
-        pts  = []
-        for x in range(0, w + step, step):
-            pts.extend((x, cy + amp * math.sin(x * freq + t * sp + phase)))
-        if len(pts) >= 4:
-            self.canvas.create_line(pts, fill=color, smooth=True, width=lw)
+    def wave_stats(self) -> dict:
+        """Frame-time and skipped-frame counters of the wave animation."""
+        return self._wave_sched.stats()
 
     # ── Full palette repaint ──────────────────────────────────────────────────
     def _apply_palette(self):
         p = self._pal
         self.canvas.configure(bg=p["canvas_bg"])
+        self._wave.recolor(p)
         self.progress_bar.configure(progress_color=p["accent"])
+        for row in self._job_rows.values():
+            row.bar.configure(progress_color=p["accent"])
         self.download_btn.configure(fg_color=p["accent"],
                                     hover_color=p["accent_hover"],
                                     text_color="#ffffff")
@@ -579,11 +895,11 @@ class NovaStreamPro(ctk.CTk):
         for btn in self._outline_btns:
             btn.configure(border_color=p["accent"], text_color=p["accent"],
                           hover_color=p["accent_dark"])
-        for cb in self._checkboxes:
+        for cb in self._checkboxes + [self.batch_cb]:
             cb.configure(checkmark_color=p["accent"],
                          hover_color=p["accent_dark"],
                          border_color=p["accent"])
-        for om in self._optionmenus + [self.quality_menu]:
+        for om in self._optionmenus + [self.quality_menu, self.prio_menu]:
             try:
                 om.configure(button_color=p["accent"],
                              button_hover_color=p["accent_hover"])
@@ -599,14 +915,22 @@ class NovaStreamPro(ctk.CTk):
         self.path_label.configure(text=t["saving_to"].format(display))
         self.sel_btn.configure(text=t["select_folder"])
         self.open_btn.configure(text=t["open_folder"])
+        self.log_btn.configure(text=t["full_log"])
         self.sub_en.configure(text=t["sub_en"])
         self.sub_fr_cb.configure(text=t["sub_fr"])
         self.theme_lbl_w.configure(text=t["theme_lbl"])
         self.palette_lbl_w.configure(text=t["palette_lbl"])
         self.mp3_lbl_w.configure(text=t["mp3_lbl"])
         self.lang_lbl_w.configure(text=t["lang_lbl"])
+        self.workers_lbl_w.configure(text=t["workers_lbl"])
+        self.conn_lbl_w.configure(text=t["conn_lbl"])
+        self.policy_lbl_w.configure(text=t["policy_lbl"])
+        self.limit_lbl_w.configure(text=t["limit_lbl"])
         self.auto_open_cb.configure(text=t["auto_open"])
         self.show_speed_cb.configure(text=t["show_speed"])
+        self.archive_cb.configure(text=t["skip_archived"])
+        self.api_cb.configure(text=t["api_toggle"])
+        self.batch_cb.configure(text=t["batch_mode"])
 
         # Section divider labels
         for lbl, key in self._sb_section_labels:
@@ -624,13 +948,26 @@ class NovaStreamPro(ctk.CTk):
         kbps_rev = {v: k for k, v in MP3_LABEL_TO_KBPS.items() if k in mp3_vals}
         self.mp3_opt.set(kbps_rev.get(self.settings["mp3_quality"], mp3_vals[1]))
 
-        # Mode switch — keep current mode
-        cur_audio = self._("mode_audio") in self.mode_switch.get() or "MP3" in self.mode_switch.get()
-        self.mode_switch.configure(values=[t["mode_video"], t["mode_audio"]])
-        self.mode_switch.set(t["mode_audio"] if cur_audio else t["mode_video"])
+        self.policy_opt.configure(values=t["policy_vals"])
+        self.policy_opt.set(t["policy_vals"][POLICIES.index(self.settings["format_policy"])])
 
-        self.download_btn.configure(text=t["dl_btn"])
-        self.progress_label.configure(text=t["ready"])
+        # Limit and priority dropdowns — keep current selection
+        self.limit_opt.configure(values=self._limit_labels())
+        self.limit_opt.set(self._limit_label(self.settings["rate_limit"]))
+        prio = self._prio_key()
+        self.prio_menu.configure(values=t["prio_vals"])
+        self.prio_menu.set(t["prio_vals"][PRIORITIES.index(prio)])
+
+        # Mode switch — keep current mode
+        mode = self._mode_key()
+        self.mode_switch.configure(values=[t[k] for k in MODE_KEYS])
+        self.mode_switch.set(t[mode])
+
+        self.download_btn.configure(
+            text=t["dl_btn"] if ENGINE_READY.is_set() else t["engine_loading"])
+        for job in self.engine.snapshot():
+            self._update_job_row(job)
+        self._refresh_overview()
         self.speed_label.configure(text=t["speed_idle"])
         self.footer.configure(text=t["footer"])
 
@@ -662,6 +999,41 @@ class NovaStreamPro(ctk.CTk):
         self._t    = STRINGS[lang]
         self._apply_language()
 
+    def _on_workers_change(self, v: str):
+        self.settings["max_workers"] = int(v)
+        self._save_settings()
+        self.engine.queue.resize(int(v))
+
+    def _on_connections_change(self, v: str):
+        self.settings["connections"] = int(v)
+        self._save_settings()
+
+    def _on_policy_change(self, v: str):
+        policy = POLICIES[self._("policy_vals").index(v)]
+        self.settings["format_policy"] = policy
+        self._save_settings()
+        self.engine.format_policy = policy
+
+    def _limit_label(self, kib: int) -> str:
+        return format_rate(kib * 1024) if kib else self._("limit_none")
+
+    def _limit_labels(self) -> list:
+        return [self._limit_label(k) for k in RATE_CHOICES]
+
+    def _on_limit_change(self, v: str):
+        kib = RATE_CHOICES[self._limit_labels().index(v)]
+        self.settings["rate_limit"] = kib
+        self._save_settings()
+        self.engine.set_rate_limit(kib)
+
+    def _prio_key(self) -> str:
+        """The selected priority; the label may still be in the old language."""
+        cur = self.prio_menu.get()
+        for t in STRINGS.values():
+            if cur in t["prio_vals"]:
+                return PRIORITIES[t["prio_vals"].index(cur)]
+        return "normal"
+
     def _on_auto_open_toggle(self):
         self.settings["auto_open"] = bool(self.auto_open_cb.get())
         self._save_settings()
@@ -673,8 +1045,52 @@ class NovaStreamPro(ctk.CTk):
             text=self._("speed_idle") if self.settings["show_speed"] else ""
         )
 
+    def _on_archive_toggle(self):
+        self.settings["skip_archived"] = bool(self.archive_cb.get())
+        self.engine.skip_archived = self.settings["skip_archived"]
+        self._save_settings()
+
+    def _on_api_toggle(self):
+        self.settings["api_enabled"] = bool(self.api_cb.get())
+        self._save_settings()
+        if self.settings["api_enabled"]:
+            self._start_api()
+        elif self._api is not None:
+            self._api.stop()
+            self._api = None
+
+    def _start_api(self):
+        import novastream_api
+        try:
+            self._api = novastream_api.start_api(self.engine, lambda: self.download_path)
+        except OSError as e:
+            self.api_cb.deselect()
+            self._log(self._("log_api_err", e))
+            return
+        self._log(self._("log_api", self._api.host, self._api.port))
+        if self._api.new_token:
+            self._log(self._("log_api_token", self._api.token))
+
+    def _start_metrics(self):
+        try:
+            self._metrics = start_metrics(self.engine, self.settings["metrics_port"])
+        except OSError as e:
+            self._log(self._("log_metrics_err", e))
+            return
+        self._log(self._("log_metrics", self._metrics.port))
+
+    def _profile_tick(self):
+        """Keep ui.folded current, so a hung or killed session still leaves one."""
+        if self._anim_running:
+            self.engine.profiler.ui_dump()
+            self.after(UI_DUMP * 1000, self._profile_tick)
+
+    def _on_batch_toggle(self):
+        self.settings["batch_mode"] = bool(self.batch_cb.get())
+        self._save_settings()
+
     def _on_mode_change(self, v: str):
-        is_audio = "MP3" in v or self._("mode_audio") in v
+        is_audio = self._mode_key() != "mode_video"
         self.quality_menu.configure(state="disabled" if is_audio else "normal")
 
     # ── File helpers ──────────────────────────────────────────────────────────
@@ -701,137 +1117,216 @@ class NovaStreamPro(ctk.CTk):
             self._log(self._("log_folder_err", e))
 
     # ── Download ──────────────────────────────────────────────────────────────
+    def _on_engine_event(self, event: str, job, info: dict):
+        """Engine events, re-posted onto the Tk thread."""
+        if event == "queued":
+            row = JobRow(self.jobs_frame, job.title, self._("queued"), self._pal["accent"])
+            row.grid(row=job.id, column=0, sticky="ew", padx=4)
+            self._job_rows[job.id] = row
+        elif event == "ready":
+            self.download_btn.configure(text=self._("dl_btn"), state="normal")
+        elif event == "engine_error":
+            self._log(self._("log_engine_err", info["error"]))
+        elif event == "ffmpeg":
+            self._log(self._("log_ffmpeg", info["version"], info["encoders"], info["muxers"]))
+        elif event == "ffmpeg_error":
+            self._log(self._("log_ffmpeg_err", info["error"]))
+        elif event == "done":
+            self._log(self._("log_skipped" if info.get("skipped") else "log_success", job.title))
+        elif event == "expanded":
+            self._log(self._("log_batch", info["entries"], job.title))
+            if info["skipped"]:
+                self._log(self._("log_batch_skip", info["skipped"]))
+        elif event == "cancelled":
+            self._log(self._("log_cancelled", job.title))
+        elif event == "no_mp3":
+            self._log(self._("log_no_mp3", job.title))
+        elif event == "waiting":
+            self._log(self._("log_wait_space", format_size(info["needed"]),
+                             format_size(info["free"]), job.title))
+        elif event == "error":
+            if info.get("unexpected"):
+                self._log(self._("log_err", info["error"]))
+            else:
+                self._log(self._("log_dl_err", job.title, info["error"]))
+        if event == "queued":
+            self._refresh_overview()
+        elif event in ("done", "retry", "waiting", "expanded", "error", "cancelled"):
+            self._on_job_finished()
+
+    def _mode_key(self) -> str:
+        """The selected MODE_KEYS entry; the label may still be in the old language."""
+        mode = self.mode_switch.get()
+        for key in MODE_KEYS:
+            if any(t[key] == mode for t in STRINGS.values()):
+                return key
+        return "mode_video"
+
     def start_thread(self):
-        url = sanitize_url(self.url_entry.get())
-        if not url:
+        # The entry accepts several links separated by spaces, commas or newlines
+        raw  = re.split(r"[\s,]+", self.url_entry.get())
+        urls = [sanitize_url(r) for r in raw if r]
+        if not urls or None in urls:
             self._log(self._("log_url_bad"))
             return
-        self.download_btn.configure(state="disabled")
-        self.log_box.delete("1.0", "end")
-        self.progress_bar.set(0)
-        self.progress_label.configure(text=self._("starting"))
-        self._wave_speed = 0.5
-        threading.Thread(target=self._download, args=(url,), daemon=True).start()
-
-    def _download(self, url: str):
-        is_audio = "MP3" in self.mode_switch.get() or self._("mode_audio") in self.mode_switch.get()
-        q        = self.quality_menu.get().replace("p", "")
-        langs    = [lc for lc, cb in [("en", self.sub_en), ("fr", self.sub_fr_cb)] if cb.get()]
-
         try:
-            safe_out = sanitize_path(self.download_path)
+            out_dir = sanitize_path(self.download_path)
         except ValueError as e:
-            msg = str(e)
-            self.after(0, lambda: self._log(self._("log_err", msg)))
-            self.after(0, lambda: self.download_btn.configure(state="normal"))
+            self._log(self._("log_err", e))
             return
-
-        opts = {
-            "ffmpeg_location":    imageio_ffmpeg.get_ffmpeg_exe(),
-            "outtmpl":            os.path.join(safe_out, "%(title)s.%(ext)s"),
-            "progress_hooks":     [self._progress_hook],
-            "writesubtitles":     bool(langs),
-            "subtitleslangs":     langs or [],
-            "ignoreerrors":       False,
-            "quiet":              True,
-            "no_warnings":        True,
-            "postprocessor_args": [],        # prevent injection via args
-            "nocheckcertificate": False,     # keep TLS verification ON
-        }
-
-        if is_audio:
-            opts["format"] = "bestaudio/best"
-            opts["postprocessors"] = [{
-                "key":              "FFmpegExtractAudio",
-                "preferredcodec":   "mp3",
-                "preferredquality": self.settings["mp3_quality"],
-            }]
+        # Snapshot the widgets here, on the Tk thread; workers never touch them
+        mode     = self._mode_key()
+        is_audio = mode != "mode_video"
+        audio_format = "original" if mode == "mode_original" else "mp3"
+        quality  = self.quality_menu.get().replace("p", "")
+        langs    = [lc for lc, cb in [("en", self.sub_en), ("fr", self.sub_fr_cb)] if cb.get()]
+        expand   = self.settings["batch_mode"]
+        priority = self._prio_key()
+        for url in dict.fromkeys(urls):
+            self.engine.submit(DownloadJob(url, is_audio, quality, langs, out_dir,
+                                           expand=expand, priority=priority,
+                                           audio_format=audio_format))
+        self.url_entry.delete(0, "end")
+
+    def _offer_resume(self):
+        """Ask whether to re-queue the jobs earlier sessions left unfinished."""
+        def adopt():                 # reads and fsyncs journals: not on the Tk thread
+            pending = self.engine.unfinished()
+            if pending:
+                self.after(0, self._ask_resume, pending)
+        threading.Thread(target=adopt, daemon=True).start()
+
+    def _ask_resume(self, pending: dict):
+        if not messagebox.askyesno(
+                self._("resume_title"), self._("resume_ask", len(pending)), parent=self):
+            self.engine.discard(pending)
+            return
+        self.engine.resume(pending)
+        self._log(self._("log_resumed", len(pending)))
+
+    def _on_job_finished(self):
+        # The engine keeps MAX_FINISHED finished jobs: drop the rows of older ones
+        for job_id in [i for i in self._job_rows if i not in self.engine.jobs]:
+            self._job_rows.pop(job_id).destroy()
+        self._refresh_overview()
+        if not self.engine.busy() and self.settings["auto_open"]:
+            self.after(600, self.open_folder)
+
+    def _progress_tick(self):
+        """Repaint the jobs that changed since the last tick (Tk thread)."""
+        if not self._anim_running:
+            return
+        dirty = self.engine.progress.drain()
+        for job in dirty:
+            self._update_job_row(job)
+        if dirty:
+            self._refresh_overview()
+        if self._log_pending:
+            self._flush_log()
+        self.after(1000 // PROGRESS_HZ, self._progress_tick)
+
+    def _status_text(self, job: DownloadJob) -> str:
+        if job.status != "downloading":
+            return self._(job.status, *job.status_args)
+        text = self._("downloading", f"{job.pct * 100:.1f}")
+        if self.settings["show_speed"] and job.speed:
+            text += f"  {format_rate(job.speed)}"
+        if job.rate.eta is not None:
+            text += "  " + self._("eta", format_eta(job.rate.eta))
+        return text
+
+    def _update_job_row(self, job: DownloadJob):
+        row = self._job_rows.get(job.id)
+        if row is not None:
+            row.update_job(job.title, job.pct, self._status_text(job))
+
+    def _refresh_overview(self):
+        """Aggregate all jobs into the main label, bar, speed and wave."""
+        active  = [j for j in self.engine.snapshot()
+                   if j.state in ("running", "postprocessing")]
+        running = [j for j in active if j.state == "running"]
+        queued  = self.engine.queue.pending()
+        speed   = sum(j.speed for j in running)
+        # Wave amplitude follows the same smoothed total, in MiB/s
+        self._wave_speed = max(0.3, min(speed / (1 << 20), 15.0)) if running else 0.0
+        if running:
+            self._wave_sched.wake()
+        if active or queued:
+            self.progress_label.configure(text=self._("overview", len(active), queued))
+            self.progress_bar.set(sum(j.pct for j in active) / len(active) if active else 0)
         else:
-            # Force mp4: prefer h264+aac; fall back gracefully
-            if q == "best":
-                fmt = (
-                    "bestvideo[ext=mp4]+bestaudio[ext=m4a]"
-                    "/bestvideo[ext=mp4]+bestaudio"
-                    "/bestvideo+bestaudio/best"
-                )
-            else:
-                fmt = (
-                    f"bestvideo[height<={q}][ext=mp4]+bestaudio[ext=m4a]"
-                    f"/bestvideo[height<={q}][ext=mp4]+bestaudio"
-                    f"/bestvideo[height<={q}]+bestaudio/best"
-                )
-            opts["format"]               = fmt
-            opts["merge_output_format"]  = "mp4"
-
-        try:
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                ydl.download([url])
-            self.after(0, lambda: self._log(self._("log_success")))
-            self.after(0, lambda: self.progress_label.configure(text=self._("done")))
-            self.after(0, lambda: self.progress_bar.set(1))
-            if self.settings["auto_open"]:
-                self.after(600, self.open_folder)
-        except yt_dlp.utils.DownloadError as e:
-            msg = str(e)
-            self.after(0, lambda: self._log(self._("log_dl_err", msg)))
-            self.after(0, lambda: self.progress_label.configure(text=self._("error")))
-        except Exception as e:
-            msg = str(e)
-            self.after(0, lambda: self._log(self._("log_err", msg)))
-            self.after(0, lambda: self.progress_label.configure(text=self._("error")))
-        finally:
-            self._wave_speed = 0.0
-            self.after(0, lambda: self.download_btn.configure(state="normal"))
-
-    def _progress_hook(self, d: dict):
-        status = d.get("status")
-        if status == "downloading":
-            raw_p     = d.get("_percent_str", "0%").strip().rstrip("%")
-            speed_str = d.get("_speed_str") or "—"
-            try:
-                pct = max(0.0, min(float(raw_p) / 100.0, 1.0))
-            except ValueError:
-                pct = 0.0
-            # Parse speed for wave amplitude
-            try:
-                if "MiB" in speed_str or "MB" in speed_str:
-                    num = float(re.sub(r"[^\d.]", "", speed_str.split("M")[0]))
-                elif "KiB" in speed_str or "KB" in speed_str:
-                    num = float(re.sub(r"[^\d.]", "", speed_str.split("K")[0])) / 1024
-                else:
-                    num = 0.5
-                self._wave_speed = max(0.3, min(num, 15.0))
-            except Exception:
-                self._wave_speed = 0.5
-
-            dl_text  = self._("downloading", raw_p)
-            show_spd = self.settings["show_speed"]
-            spd_text = speed_str
-
-            def _ui():
-                self.progress_bar.set(pct)
-                self.progress_label.configure(text=dl_text)
-                if show_spd:
-                    self.speed_label.configure(text=f"  {spd_text}")
-
-            self.after(0, _ui)
-
-        elif status == "finished":
-            self._wave_speed = 0.2
-            self.after(0, lambda: self.progress_label.configure(text=self._("finalizing")))
+            self.progress_label.configure(text=self._("ready"))
+        if self.settings["show_speed"]:
+            self.speed_label.configure(
+                text=f"  {format_rate(speed)}" if running else self._("speed_idle")
+            )
 
     def _log(self, msg: str):
-        self.log_box.insert("end", msg + "\n")
+        """Record a message: queued for the log file, to the view on the next tick."""
+        log.info(msg)
+        self._log_pending.append(msg)
+
+    def _flush_log(self):
+        """One insert per tick, then trim the view to LOG_MAX_LINES."""
+        lines = []
+        while self._log_pending:
+            lines.append(self._log_pending.popleft())
+        self.log_box.insert("end", "\n".join(lines) + "\n")
+        self._log_lines += sum(1 + line.count("\n") for line in lines)
+        excess = self._log_lines - LOG_MAX_LINES
+        if excess > 0:
+            self.log_box.delete("1.0", f"{excess + 1}.0")
+            self._log_lines -= excess
         self.log_box.see("end")
 
+    def show_full_log(self):
+        """Open the complete on-disk history in a separate window.
+
+        The files (up to a few MB) are read on a background thread and
+        inserted FULL_LOG_SLICE lines per turn, so the window stays live.
+        """
+        win = ctk.CTkToplevel(self)
+        win.title(self._("full_log").strip("📄 "))
+        win.geometry("900x600")
+        box = ctk.CTkTextbox(win, font=(FONT_MONO, FONT_SM), wrap="none")
+        box.pack(fill="both", expand=True, padx=8, pady=8)
+        win.after(100, win.lift)
+
+        def fill(lines: list, start: int):
+            if not box.winfo_exists():
+                return               # closed while loading
+            box.insert("end", "".join(lines[start:start + FULL_LOG_SLICE]))
+            if start + FULL_LOG_SLICE < len(lines):
+                self.after(1, fill, lines, start + FULL_LOG_SLICE)
+            else:
+                box.configure(state="disabled")
+                box.see("end")
+
+        def load():
+            flush_file_log()
+            lines = read_full_log(LOG_FILE).splitlines(keepends=True)
+            self.after(0, fill, lines, 0)
+        threading.Thread(target=load, daemon=True).start()
+
     # ── Cleanup ───────────────────────────────────────────────────────────────
     def on_closing(self):
         self._anim_running = False
+        self._wave_sched.stop()
+        if self._api is not None:
+            self._api.stop()
+        if self._metrics is not None:
+            self._metrics.stop()
+        if self.engine.profiler is not None:
+            self.engine.profiler.ui_dump(stop=True)
+        self.engine.close()
+        close_file_log()
         self.destroy()
 
 
 # ── Entry point ───────────────────────────────────────────────────────────────
 if __name__ == "__main__":
+    if "--headless" in sys.argv[1:]:
+        sys.exit(run_headless())
     app = NovaStreamPro()
     app.protocol("WM_DELETE_WINDOW", app.on_closing)
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+NovaStream Pro - opt-in profiling
+Author : Rizinkovic
+
+Profiles of a real session, to attach to bug reports. When profiling is on
+(the "profile" setting, or --profile for the headless CLI), every run gets
+its own folder under ~/.novastream_profiles/<date>-<pid>/ with:
+
+    job<id>-<uid>-run.folded   stacks sampled from the job's worker thread:
+                               extraction, download, bookkeeping (all attempts)
+    job<id>-<uid>-post.folded  the same for its ffmpeg post-processing
+    job<id>-<uid>-mem.txt      tracemalloc: what grew between the job's start
+                               and end, and the traced / peak totals
+    job<id>-<uid>-end.snap     the tracemalloc snapshot at the job's end
+    ui.folded                  stacks of the Tk thread (GUI only), rewritten
+                               every UI_DUMP seconds and on close
+
+A sampler thread reads the stack of every thread working for a job (or
+the UI) SAMPLE_HZ times a second, so each dump covers just its own job on
+any Python version. cProfile cannot do that: from 3.12 on it hooks
+sys.monitoring, one profiler for the whole interpreter. The .folded files
+are "frame;frame;frame count" lines, as read by flamegraph.pl, speedscope
+or inferno. Read .snap files with tracemalloc.Snapshot.load(). Memory is
+process-wide: with parallel downloads a job's growth includes the others'.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".novastream_profiles")
+SAMPLE_HZ   = 100              # stack samples per second per profiled thread
+MAX_DEPTH   = 96               # frames kept per sample, innermost first
+FRAMES      = 5                # stack depth kept per tracemalloc allocation
+TOP         = 40               # lines of memory growth per job report
+UI_DUMP     = 30               # seconds between ui.folded rewrites
+FINAL       = ("done", "error", "cancelled")
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def fold(frame) -> tuple:
+    """The stack of ``frame``, outermost first, as labels."""
+    stack = []
+    while frame is not None and len(stack) < MAX_DEPTH:
+        stack.append(frame_label(frame))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def write_folded(path: str, samples: collections.Counter):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, n in samples.most_common():
+            f.write(f"{';'.join(stack)} {n}\n")
+
+
+class SessionProfiler:
+    """Sampled stacks per job phase and for the UI thread, tracemalloc per job."""
+
+    def __init__(self, root: str = PROFILE_DIR):
+        self.folder = os.path.join(root, time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}")
+        os.makedirs(self.folder, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(FRAMES)
+        self._jobs    = {}           # job id → {"job", "snap"}
+        self._threads = {}           # thread ident → sample key: (job id, phase) or "ui"
+        self._samples = {}           # sample key → Counter of stacks
+        self._lock    = threading.Lock()
+        self._writing = 0            # finish() calls in progress
+        threading.Thread(target=self._sample, daemon=True).start()
+
+    def _stem(self, job) -> str:
+        return os.path.join(self.folder, f"job{job.id}-{job.uid[:8]}")
+
+    def _sample(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(1 / SAMPLE_HZ)
+            with self._lock:
+                threads = dict(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            stacks = [(key, fold(frames[tid])) for tid, key in threads.items()
+                      if tid != me and tid in frames]
+            del frames
+            with self._lock:
+                for key, stack in stacks:
+                    if key in self._samples:
+                        self._samples[key][stack] += 1
+
+    # ── Jobs ──────────────────────────────────────────────────────────────────
+    def begin(self, job, phase: str):
+        """Sample the calling thread for ``job`` until end(); "run" or "post"."""
+        if job.id not in self._jobs:
+            snap = tracemalloc.take_snapshot()      # slow: not under the lock
+            with self._lock:
+                self._jobs.setdefault(job.id, {"job": job, "snap": snap})
+        with self._lock:
+            self._samples.setdefault((job.id, phase), collections.Counter())
+            self._threads[threading.get_ident()] = (job.id, phase)
+
+    def end(self, job, phase: str):
+        with self._lock:
+            tid = threading.get_ident()
+            if self._threads.get(tid) == (job.id, phase):
+                del self._threads[tid]
+
+    def finish(self, job):
+        """Write the job's dumps, once it is done, failed or cancelled."""
+        with self._lock:
+            entry = self._jobs.pop(job.id, None)
+            if entry is None:
+                return
+            samples = {key[1]: self._samples.pop(key) for key in list(self._samples)
+                       if key != "ui" and key[0] == job.id}
+            self._writing += 1
+        stem = self._stem(job)
+        try:
+            for phase, counter in samples.items():
+                write_folded(f"{stem}-{phase}.folded", counter)
+            snap = tracemalloc.take_snapshot()
+            snap.dump(f"{stem}-end.snap")
+            current, peak = tracemalloc.get_traced_memory()
+            with open(f"{stem}-mem.txt", "w", encoding="utf-8") as f:
+                f.write(f"{job.url}\n{job.title}\nstate: {job.state}\n"
+                        f"traced: {current / 1048576:.1f} MiB, peak {peak / 1048576:.1f} MiB\n\n"
+                        f"Top {TOP} growths since the job started:\n")
+                for stat in snap.compare_to(entry["snap"], "lineno")[:TOP]:
+                    f.write(f"{stat}\n")
+        except OSError:
+            pass                     # a full disk must not fail the job
+        finally:
+            with self._lock:
+                self._writing -= 1
+
+    def close(self, timeout: float = 30):
+        """Wait for the dumps of jobs that just ended; their threads are
+        daemons, so exiting first would cut the files short."""
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            with self._lock:
+                busy = self._writing or any(e["job"].state in FINAL
+                                            for e in self._jobs.values())
+            if not busy:
+                return
+            time.sleep(0.05)
+
+    # ── UI thread ─────────────────────────────────────────────────────────────
+    def ui_begin(self):
+        """Sample the calling (Tk) thread from now on."""
+        with self._lock:
+            self._samples.setdefault("ui", collections.Counter())
+            self._threads[threading.get_ident()] = "ui"
+
+    def ui_dump(self, stop: bool = False):
+        """Rewrite ui.folded with everything so far; from the Tk thread."""
+        with self._lock:
+            counter = self._samples.get("ui")
+            if counter is None:
+                return
+            counter = collections.Counter(counter)
+            if stop:
+                del self._samples["ui"]
+                self._threads.pop(threading.get_ident(), None)
+        try:
+            write_folded(os.path.join(self.folder, "ui.folded"), counter)
+        except OSError:
+            pass
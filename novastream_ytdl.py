@@ -0,0 +1,280 @@
+"""
+NovaStream Pro - yt-dlp extensions
+Author : Rizinkovic
+
+Subclasses of yt-dlp internals. Kept apart from the app module so that
+yt-dlp (and its extractors) are only imported by the background warm-up,
+after the window is on screen.
+"""
+
+import errno
+import os
+import re
+import json
+import threading
+import time
+
+import yt_dlp
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.networking import Request
+from yt_dlp.utils.networking import HTTPHeaderDict
+
+
+def preallocate(f, size: int):
+    """Reserve ``size`` bytes for ``f`` on disk, contiguously where the
+    filesystem can; otherwise just extend it (sparse)."""
+    try:
+        os.posix_fallocate(f.fileno(), 0, size)
+    except AttributeError:       # not on Windows, where truncate allocates
+        f.truncate(size)
+    except OSError as e:
+        if e.errno == errno.ENOSPC:
+            raise
+        f.truncate(size)         # EOPNOTSUPP / EINVAL: the filesystem can't
+
+
+# ── Segmented HTTP downloads ──────────────────────────────────────────────────
+class SegmentedHttpFD(HttpFD):
+    """HttpFD that fetches a progressive file as N parallel byte ranges.
+
+    Each range is written in place into the preallocated ``.part`` file and
+    its position is checkpointed in a ``.part.ranges`` sidecar, so an
+    interrupted download resumes every range where it stopped. Falls back
+    to the plain single-stream download when the server ignores Range,
+    the size is unknown or the file is too small to be worth splitting.
+    """
+
+    MIN_SEGMENT = 1 << 20
+    BLOCK       = 64 * 1024
+
+    def real_download(self, filename, info_dict):
+        n       = int(self.params.get("segmented_connections") or 1)
+        url     = info_dict["url"]
+        headers = HTTPHeaderDict({"Accept-Encoding": "identity"},
+                                 info_dict.get("http_headers"))
+        tmp     = self.temp_name(filename)
+        sidecar = tmp + ".ranges"
+        if n < 2 or "Range" in headers or self.params.get("test"):
+            return super().real_download(filename, info_dict)
+
+        ranges = self._load_ranges(sidecar, tmp)
+        if ranges is None:
+            total = self._probe_size(url, headers)
+            if os.path.exists(tmp):
+                if not total or os.path.getsize(tmp) != total:
+                    # A single-stream partial: let HttpFD resume it as-is
+                    return super().real_download(filename, info_dict)
+                # Preallocated by a run that died before its sidecar: which
+                # bytes are still zeros is unknown, so start over
+                os.remove(tmp)
+            if not total or total < 2 * self.MIN_SEGMENT:
+                return super().real_download(filename, info_dict)
+            n    = min(n, total // self.MIN_SEGMENT)
+            step = total // n
+            ranges = [[i * step, total - 1 if i == n - 1 else (i + 1) * step - 1]
+                      for i in range(n)]
+            with open(tmp, "wb") as f:
+                preallocate(f, total)
+            # Checkpoint before any range starts, or a crash would leave the above
+            if not self._save_ranges(sidecar, ranges):
+                os.remove(tmp)
+                return super().real_download(filename, info_dict)
+        total = os.path.getsize(tmp)
+
+        self.report_destination(filename)
+        lock   = threading.Lock()
+        stop   = threading.Event()
+        errors = []
+        start  = time.time()
+        resume = total - sum(end - pos + 1 for pos, end in ranges)
+        done   = [resume]
+        throttle = getattr(self.ydl, "throttle", None)
+
+        def fetch(rng):
+            retries = self.params.get("retries", 10)
+            with open(tmp, "r+b") as f:
+                while rng[0] <= rng[1] and not stop.is_set():
+                    try:
+                        req = Request(url, headers=dict(headers, Range=f"bytes={rng[0]}-{rng[1]}"))
+                        with self.ydl.urlopen(req) as resp:
+                            if resp.status != 206:
+                                raise OSError(f"server ignored Range (HTTP {resp.status})")
+                            f.seek(rng[0])
+                            while rng[0] <= rng[1] and not stop.is_set():
+                                chunk = resp.read(self.BLOCK)
+                                if not chunk:
+                                    # A failed attempt, or a truncating server loops forever
+                                    raise OSError("connection closed early")
+                                chunk = chunk[:rng[1] - rng[0] + 1]
+                                f.write(chunk)
+                                with lock:
+                                    rng[0]  += len(chunk)
+                                    done[0] += len(chunk)
+                                if throttle is not None:
+                                    throttle(len(chunk))
+                    except Exception as e:
+                        retries -= 1
+                        if retries < 0:
+                            errors.append(e)
+                            stop.set()
+                            return
+                        time.sleep(1)
+
+        threads = [threading.Thread(target=fetch, args=(r,), daemon=True)
+                   for r in ranges if r[0] <= r[1]]
+        for t in threads:
+            t.start()
+        try:
+            while any(t.is_alive() for t in threads):
+                deadline = time.monotonic() + 0.5   # one report per 0.5 s, not per thread
+                for t in threads:
+                    t.join(max(0.0, deadline - time.monotonic()))
+                with lock:
+                    got = done[0]
+                    self._save_ranges(sidecar, ranges)
+                now   = time.time()
+                speed = self.calc_speed(start, now, got - resume)
+                self._hook_progress({
+                    "status":           "downloading",
+                    "downloaded_bytes": got,
+                    "total_bytes":      total,
+                    "tmpfilename":      tmp,
+                    "filename":         filename,
+                    "eta":              self.calc_eta(speed, total - got) if speed else None,
+                    "speed":            speed,
+                    "elapsed":          now - start,
+                    "nova_throttled":   True,      # bytes already charged above
+                }, info_dict)
+        except BaseException:
+            # A hook aborted the download (cancel, Ctrl-C): stop the ranges
+            # and keep the sidecar so a later run resumes where they were
+            stop.set()
+            for t in threads:
+                t.join()
+            self._save_ranges(sidecar, ranges)
+            raise
+
+        if errors:
+            self._save_ranges(sidecar, ranges)
+            self.report_error(f"unable to download {len(errors)} range(s): {errors[0]}")
+            return False
+
+        try:
+            os.remove(sidecar)
+        except OSError:
+            pass
+        self.try_rename(tmp, filename)
+        self._hook_progress({
+            "status":           "finished",
+            "downloaded_bytes": total,
+            "total_bytes":      total,
+            "filename":         filename,
+            "elapsed":          time.time() - start,
+        }, info_dict)
+        return True
+
+    def _probe_size(self, url: str, headers) -> int:
+        """Total size from a one-byte Range request, or 0 if unsupported."""
+        try:
+            with self.ydl.urlopen(Request(url, headers=dict(headers, Range="bytes=0-0"))) as resp:
+                m = re.match(r"bytes 0-0/(\d+)", resp.headers.get("Content-Range") or "")
+                return int(m.group(1)) if resp.status == 206 and m else 0
+        except Exception:
+            return 0
+
+    @staticmethod
+    def _load_ranges(sidecar: str, tmp: str):
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data["size"] == os.path.getsize(tmp):
+                return data["ranges"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    @staticmethod
+    def _save_ranges(sidecar: str, ranges: list) -> bool:
+        try:
+            size = os.path.getsize(sidecar[:-len(".ranges")])
+            with open(sidecar + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"size": size, "ranges": ranges}, f)
+            os.replace(sidecar + ".tmp", sidecar)
+            return True
+        except OSError:
+            return False
+
+
+class NovaYoutubeDL(yt_dlp.YoutubeDL):
+    """YoutubeDL that routes progressive http(s) formats to SegmentedHttpFD
+    and can hand post-processing to another thread."""
+
+    # throttle(nbytes): blocks while over the shared bandwidth limit. Set
+    # by the app's YdlPool; the segmented ranges call it per chunk.
+    throttle = None
+    # defer_post(ydl, filename, info, files_to_move): takes ffmpeg work off
+    # the download thread; the app later calls run_post_process() with the
+    # arguments, on an instance with the same options.
+    defer_post = None
+
+    # preflight(ydl, info): sees the selected format(s) before anything is
+    # written and raises to refuse the download. Set by the app's YdlPool.
+    preflight = None
+
+    def process_info(self, info_dict):
+        if self.preflight is not None and not self.params.get("simulate"):
+            self.preflight(self, info_dict)
+        return super().process_info(info_dict)
+
+    def post_process(self, filename, info, files_to_move=None):
+        if self.defer_post is None:
+            return super().post_process(filename, info, files_to_move)
+        info["filepath"] = filename
+        self.defer_post(self, filename, dict(info), files_to_move)
+        return info
+
+    # Per thread, in case several threads post-process on one instance
+    _pp_local = threading.local()
+
+    def has_post_process(self, info) -> bool:
+        """Whether post_process(info) runs more than the final file move."""
+        return bool(self._pps["post_process"] or self._pps["after_move"]
+                    or info.get("__postprocessors"))
+
+    def run_post_process(self, filename, info, files_to_move=None, timings=None):
+        """The post-processing that post_process() deferred. ``timings``, a
+        list, gets a (postprocessor key, seconds) pair for every run."""
+        self._pp_local.timings = timings
+        try:
+            return super().post_process(filename, info, files_to_move)
+        finally:
+            self._pp_local.timings = None
+
+    def run_pp(self, pp, infodict):
+        timings = getattr(self._pp_local, "timings", None)
+        if timings is None:
+            return super().run_pp(pp, infodict)
+        t0 = time.perf_counter()
+        try:
+            return super().run_pp(pp, infodict)
+        finally:
+            timings.append((pp.pp_key(), time.perf_counter() - t0))
+
+    def record_download_archive(self, info_dict):
+        # Deferred items are recorded by the app once post-processing succeeded
+        if self.defer_post is None:
+            super().record_download_archive(info_dict)
+
+    def dl(self, name, info, subtitle=False, test=False):
+        if ((self.params.get("segmented_connections") or 1) > 1
+                and not (test or subtitle) and name != "-"
+                and info.get("protocol") in ("http", "https")
+                and not self.params.get("external_downloader")):
+            fd = SegmentedHttpFD(self, self.params)
+            for ph in self._progress_hooks:
+                fd.add_progress_hook(ph)
+            new_info = self._copy_infodict(info)
+            if new_info.get("http_headers") is None:
+                new_info["http_headers"] = self._calc_headers(new_info)
+            return fd.download(name, new_info, subtitle)
+        return super().dl(name, info, subtitle, test)
@@ -0,0 +1,46 @@
+"""Format lists shaped like real extractor output, for the format tests and
+benchmarks/bench_format_policy.py."""
+
+MB = 1024 * 1024
+
+
+def fmt(fid, ext, vcodec, acodec, height=None, tbr=0, mb=0, fps=None, abr=None):
+    return {"format_id": fid, "ext": ext, "vcodec": vcodec, "acodec": acodec,
+            "height": height, "fps": fps, "tbr": tbr, "abr": abr,
+            "filesize": int(mb * MB), "protocol": "https", "url": f"https://example.invalid/{fid}"}
+
+
+# A 10 minute video, worst to best as the extractor sorts them
+DASH = [
+    fmt("249", "webm", "none", "opus", tbr=50, abr=50, mb=3.4),
+    fmt("139", "m4a", "none", "mp4a.40.5", tbr=49, abr=49, mb=3.6),
+    fmt("250", "webm", "none", "opus", tbr=66, abr=66, mb=4.4),
+    fmt("251", "webm", "none", "opus", tbr=131, abr=131, mb=8.9),
+    fmt("140", "m4a", "none", "mp4a.40.2", tbr=129, abr=129, mb=9.7),
+    fmt("394", "mp4", "av01.0.00M.08", "none", 144, 55, 3.0, 30),
+    fmt("160", "mp4", "avc1.4d400c", "none", 144, 60, 3.4, 30),
+    fmt("278", "webm", "vp9", "none", 144, 70, 4.0, 30),
+    fmt("395", "mp4", "av01.0.00M.08", "none", 240, 110, 6.2, 30),
+    fmt("242", "webm", "vp9", "none", 240, 120, 6.8, 30),
+    fmt("133", "mp4", "avc1.4d4015", "none", 240, 140, 7.5, 30),
+    fmt("396", "mp4", "av01.0.01M.08", "none", 360, 200, 11, 30),
+    fmt("243", "webm", "vp9", "none", 360, 230, 12, 30),
+    fmt("134", "mp4", "avc1.4d401e", "none", 360, 280, 15, 30),
+    fmt("18", "mp4", "avc1.42001E", "mp4a.40.2", 360, 500, 26, 30),
+    fmt("397", "mp4", "av01.0.04M.08", "none", 480, 380, 20, 30),
+    fmt("244", "webm", "vp9", "none", 480, 420, 23, 30),
+    fmt("135", "mp4", "avc1.4d401f", "none", 480, 520, 29, 30),
+    fmt("398", "mp4", "av01.0.05M.08", "none", 720, 780, 42, 30),
+    fmt("247", "webm", "vp9", "none", 720, 850, 46, 30),
+    fmt("136", "mp4", "avc1.4d401f", "none", 720, 1100, 60, 30),
+    fmt("399", "mp4", "av01.0.08M.08", "none", 1080, 1400, 76, 30),
+    fmt("248", "webm", "vp9", "none", 1080, 1600, 88, 30),
+    fmt("137", "mp4", "avc1.640028", "none", 1080, 2200, 120, 30),
+]
+
+PROGRESSIVE = [
+    fmt("http-360p", "mp4", "avc1.4d401e", "mp4a.40.2", 360, 700, 52, 25),
+    fmt("http-540p", "mp4", "avc1.4d401f", "mp4a.40.2", 540, 1500, 110, 25),
+    fmt("http-720p", "mp4", "avc1.64001f", "mp4a.40.2", 720, 2600, 190, 25),
+    fmt("http-1080p", "mp4", "avc1.640028", "mp4a.40.2", 1080, 5200, 380, 25),
+]
@@ -0,0 +1,127 @@
+"""The job API over real HTTP, against a stub engine."""
+
+import http.client
+import json
+import socket
+
+import pytest
+
+from novastream_api import ApiServer, start_api
+from novastream_engine import DEFAULT_SETTINGS
+
+TOKEN = "test-token"
+
+
+class StubEngine:
+    """What ApiServer uses of DownloadEngine; submit() only records and emits."""
+
+    def __init__(self):
+        self.settings  = dict(DEFAULT_SETTINGS)
+        self.listeners = []
+        self.jobs      = {}
+        self.saved     = 0
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def snapshot(self) -> list:
+        return list(self.jobs.values())
+
+    def submit(self, job):
+        self.jobs[job.id] = job
+        for listener in self.listeners:
+            listener("queued", job, {})
+
+    def save_settings(self):
+        self.saved += 1
+
+
+@pytest.fixture
+def api(tmp_path):
+    srv = ApiServer(StubEngine(), "127.0.0.1", 0, TOKEN, lambda: str(tmp_path))
+    srv.start()
+    yield srv
+    srv.stop()
+
+
+def request(api, method: str, path: str, body=None, token: str = TOKEN, **headers):
+    conn = http.client.HTTPConnection(api.host, api.port, timeout=10)
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    data = None
+    if body is not None:
+        data = json.dumps(body).encode("utf-8")
+        headers.setdefault("Content-Type", "application/json")
+    conn.request(method, path, data, headers)
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read() or b"null")
+
+
+def test_token_required(api):
+    status, payload = request(api, "GET", "/jobs", token=None)
+    assert status == 401
+    assert "token" in payload["error"]
+    assert request(api, "GET", "/jobs", token="wrong")[0] == 401
+    assert request(api, "GET", "/jobs") == (200, [])
+
+
+def test_browser_requests_refused(api):
+    assert request(api, "GET", "/jobs", Origin="https://evil.example")[0] == 403
+    assert request(api, "GET", "/jobs", Host="evil.example")[0] == 403
+    status, _ = request(api, "POST", "/jobs", {"url": "https://example.com/v"},
+                        **{"Content-Type": "text/plain"})
+    assert status == 415
+
+
+def test_submit_job(api, tmp_path):
+    status, jobs = request(api, "POST", "/jobs",
+                           {"urls": ["https://example.com/a", "https://example.com/a",
+                                     "https://example.com/b"], "quality": "720p"})
+    assert status == 201
+    assert [j["url"] for j in jobs] == ["https://example.com/a", "https://example.com/b"]
+    assert all(j["quality"] == "720" and j["out_dir"] == str(tmp_path) for j in jobs)
+    assert request(api, "GET", f"/jobs/{jobs[1]['id']}")[1]["url"] == "https://example.com/b"
+    assert request(api, "POST", "/jobs", {"url": "file:///etc/passwd"})[0] == 400
+    assert request(api, "GET", "/jobs/999999")[0] == 404
+
+
+def test_events_stream(api):
+    conn = http.client.HTTPConnection(api.host, api.port, timeout=10)
+    conn.request("GET", "/events", headers={"Authorization": f"Bearer {TOKEN}"})
+    resp = conn.getresponse()
+    assert resp.status == 200
+    assert resp.getheader("Content-Type") == "text/event-stream"
+    status, (job,) = request(api, "POST", "/jobs", {"url": "https://example.com/live"})
+    assert status == 201
+    assert resp.readline() == b"event: queued\n"
+    data = resp.readline()
+    assert data.startswith(b"data: ")
+    rec = json.loads(data[len(b"data: "):])
+    assert (rec["event"], rec["job"], rec["url"]) == ("queued", job["id"], job["url"])
+    conn.close()
+
+
+def test_stop_frees_the_port(tmp_path):
+    engine = StubEngine()
+    engine.settings.update(api_host="127.0.0.1", api_port=0)
+    api = start_api(engine, lambda: str(tmp_path))
+    assert not api.new_token                    # loopback: no token forced
+    port = api.port
+    api.stop()
+    assert not api._thread.is_alive()
+    with socket.socket() as s:                  # would raise EADDRINUSE
+        s.bind(("127.0.0.1", port))
+
+
+def test_non_local_bind_gets_a_token(tmp_path):
+    engine = StubEngine()
+    engine.settings.update(api_host="0.0.0.0", api_port=0, api_token="")
+    api = start_api(engine, lambda: str(tmp_path))
+    try:
+        assert api.new_token and api.token == engine.settings["api_token"]
+        assert engine.saved == 1
+    finally:
+        api.stop()
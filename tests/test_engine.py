@@ -0,0 +1,70 @@
+"""DownloadEngine bookkeeping that needs no network."""
+
+import pytest
+
+import novastream_engine
+from novastream_engine import DownloadJob
+
+
+def job(url: str, state: str) -> DownloadJob:
+    j = DownloadJob(url, False, "best", [], "/tmp")
+    j.state = state
+    return j
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """An engine whose cache, journal and archive live under tmp_path."""
+    for name, path in (("CACHE_DIR", "cache"), ("JOURNAL_DIR", "jobs"),
+                       ("ARCHIVE_FILE", "archive.txt"), ("METRICS_FILE", "metrics.jsonl")):
+        monkeypatch.setattr(novastream_engine, name, str(tmp_path / path))
+    events = []
+    eng = novastream_engine.DownloadEngine(
+        dict(novastream_engine.DEFAULT_SETTINGS, job_metrics=False),
+        lambda event, j, info: events.append((event, j and j.id)),
+        workers=1, settings_path=str(tmp_path / "settings.json"))
+    eng.events = events
+    return eng
+
+
+def test_engine_keeps_max_finished(engine):
+    limit = novastream_engine.MAX_FINISHED
+    running = job("https://example.com/running", "running")
+    engine.jobs[running.id] = running
+    finished = []
+    for i in range(limit + 20):
+        j = job(f"https://example.com/{i}", "done")
+        engine.jobs[j.id] = j
+        engine._emit("expanded" if i % 2 else "done", j)    # playlist parents too
+        finished.append(j)
+    assert len(engine.events) == limit + 20     # every listener saw every finish
+    assert running.id in engine.jobs
+    assert [j.id for j in finished[20:]] == [j.id for j in engine.snapshot()
+                                             if j is not running]
+
+
+def test_mp3_without_encoder_falls_back_loudly(engine):
+    a = DownloadJob("https://example.com/a", True, "best", [], "/tmp")
+    a.attempts = 1
+    engine.ffmpeg = {"encoders": ["aac", "libopus"], "muxers": ["mp4"]}
+    opts = engine._build_opts(a)
+    assert opts["postprocessors"] == [{"key": "FFmpegExtractAudio", "preferredcodec": "best"}]
+    assert ("no_mp3", a.id) in engine.events
+    engine.ffmpeg = {"encoders": ["libmp3lame"], "muxers": ["mp4"]}
+    assert engine._build_opts(a)["postprocessors"][0]["preferredcodec"] == "mp3"
+    assert engine.events.count(("no_mp3", a.id)) == 1
+
+
+def test_file_log_is_written_in_the_background(tmp_path):
+    path = str(tmp_path / "app.log")
+    before = list(novastream_engine.log.handlers)
+    novastream_engine.setup_file_log(path)
+    try:
+        for i in range(1000):
+            novastream_engine.log.info("line %d", i)
+        novastream_engine.flush_file_log()
+        lines = novastream_engine.read_full_log(path).splitlines()
+        assert len(lines) == 1000 and lines[-1].endswith("  line 999")
+    finally:
+        novastream_engine.close_file_log()
+        novastream_engine.log.handlers[:] = before
@@ -0,0 +1,101 @@
+"""novastream_formats.select / FormatPolicy over recorded format lists."""
+
+import pytest
+import yt_dlp
+
+from format_fixtures import DASH, PROGRESSIVE, fmt
+from novastream_formats import FormatPolicy, est_bytes, select
+
+
+def ids(fmts: list) -> list:
+    return [f["format_id"] for f in fmts]
+
+
+@pytest.mark.parametrize("quality, policy, expected", [
+    ("best", "best",        ["137", "140"]),     # avc1 + m4a at the top height
+    ("best", "smallest",    ["399", "251"]),     # fewest bytes at 1080p, audio ≥ 96k
+    ("best", "progressive", ["137", "140"]),     # no muxed 1080p: as "best"
+    ("360",  "best",        ["18"]),             # the muxed avc1 file is as good
+    ("360",  "smallest",    ["396", "251"]),     # 19.9 MB beats the 26 MB muxed file
+    ("360",  "progressive", ["18"]),
+    ("720",  "best",        ["136", "140"]),
+])
+def test_dash(quality, policy, expected):
+    assert ids(select(DASH, quality, policy)) == expected
+
+
+@pytest.mark.parametrize("policy", ["best", "smallest", "progressive"])
+def test_muxed_only(policy):
+    assert ids(select(PROGRESSIVE, "720", policy)) == ["http-720p"]
+    assert ids(select(PROGRESSIVE, "best", policy)) == ["http-1080p"]
+
+
+@pytest.mark.parametrize("policy", ["best", "smallest", "progressive"])
+def test_cap_below_every_format(policy):
+    # Nothing at or under 240p: the lowest resolution there is, not nothing
+    assert ids(select(PROGRESSIVE, "240", policy)) == ["http-360p"]
+
+
+@pytest.mark.parametrize("policy", ["best", "smallest", "progressive"])
+def test_cap_above_every_format(policy):
+    up_to_720 = [f for f in PROGRESSIVE if f["height"] <= 720]
+    assert ids(select(up_to_720, "1080", policy)) == ["http-720p"]
+
+
+def test_cap_below_every_dash_video():
+    assert ids(select(DASH, "240", "best")) == ["133", "140"]
+    assert ids(select(DASH, "240", "smallest")) == ["395", "251"]
+
+
+@pytest.mark.parametrize("policy", ["best", "smallest", "progressive"])
+def test_audio_only(policy):
+    audio = [f for f in DASH if f["vcodec"] == "none"]
+    assert ids(select(audio, "best", policy)) == ["140"]     # yt-dlp's order: the last
+    assert select([], "best", policy) == []
+
+
+def test_unknown_size():
+    known   = fmt("known", "mp4", "avc1.64001f", "mp4a.40.2", 720, 2600, 190, 25)
+    unknown = fmt("unknown", "mp4", "avc1.64001f", "mp4a.40.2", 720, 900, 0, 25)
+    assert est_bytes(unknown) == float("inf")
+    assert ids(select([unknown, known], "720", "smallest")) == ["known"]
+    # filesize_approx counts as a size
+    unknown["filesize_approx"] = 60 * 1024 * 1024
+    assert ids(select([unknown, known], "720", "smallest")) == ["unknown"]
+
+
+def test_unknown_codecs_are_kept():
+    formats = [{"format_id": "a", "url": "https://example.invalid/a", "height": 480},
+               {"format_id": "b", "url": "https://example.invalid/b", "height": 720}]
+    assert ids(select(formats, "best", "best")) == ["b"]
+    assert ids(select(formats, "480", "smallest")) == ["a"]
+
+
+def test_policy_merges_pairs():
+    ctx = {"formats": DASH}
+    merged, = FormatPolicy("best", "best", "mp4")(ctx)
+    assert merged["format_id"] == "137+140"
+    assert ids(merged["requested_formats"]) == ["137", "140"]
+    assert merged["ext"] == "mp4"
+    assert merged["protocol"] == "https+https"
+    assert merged["height"] == 1080 and merged["acodec"] == "mp4a.40.2"
+    single, = FormatPolicy("progressive", "360", "mp4")(ctx)
+    assert single["format_id"] == "18"
+
+
+def test_policy_repr_is_its_identity():
+    assert repr(FormatPolicy("best", "720", "mp4")) == repr(FormatPolicy("best", "720", "mp4"))
+    assert repr(FormatPolicy("best", "720", "mp4")) != repr(FormatPolicy("smallest", "720", "mp4"))
+
+
+@pytest.mark.parametrize("policy, expected", [
+    ("best", "137+140"), ("smallest", "399+251"), ("progressive", "137+140")])
+def test_policy_through_yt_dlp(policy, expected):
+    info = {"id": "x", "title": "x", "extractor": "test", "extractor_key": "Test",
+            "webpage_url": "https://example.invalid/x", "duration": 600,
+            "formats": [dict(f) for f in DASH]}
+    opts = {"format": FormatPolicy(policy, "best", "mp4"), "quiet": True,
+            "simulate": True, "no_warnings": True}
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        result = ydl.process_ie_result(info, download=False)
+    assert result["format_id"] == expected
@@ -0,0 +1,82 @@
+"""JobJournal: write-behind records, replay, compaction and adoption."""
+
+import json
+import os
+import time
+
+import novastream_engine
+from novastream_engine import DownloadJob, JobJournal
+
+
+def job(url: str, state: str) -> DownloadJob:
+    j = DownloadJob(url, False, "best", [], "/tmp")
+    j.state = state
+    return j
+
+
+def test_replay_after_flush(tmp_path):
+    journal = JobJournal(str(tmp_path))
+    a = job("https://example.com/a", "queued")
+    journal.add(a)
+    a.state = "running"
+    journal.update(a, part="/tmp/a.mp4.part")
+    journal.flush()
+    rec = journal.replay()[a.uid]
+    assert rec["state"] == "running"
+    assert rec["spec"]["url"] == a.url
+    assert rec["parts"] == ["/tmp/a.mp4.part"]
+
+
+def test_compact_keeps_unfinished_only(tmp_path):
+    journal = JobJournal(str(tmp_path))
+    jobs = [job(f"https://example.com/{s}", s)
+            for s in ("queued", "running", "postprocessing", "done", "error", "cancelled")]
+    for j in jobs:
+        journal.add(j)
+    gone = job("https://example.com/gone", "running")
+    journal.add(gone)
+    journal.discard([gone.uid])
+    journal.compact()
+    assert set(journal.replay()) == {j.uid for j in jobs[:3]}
+    with open(journal.path, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 3
+
+
+def test_compacts_periodically(tmp_path, monkeypatch):
+    monkeypatch.setattr(novastream_engine, "COMPACT_LINES", 10)
+    journal = JobJournal(str(tmp_path))
+    for i in range(25):
+        j = job(f"https://example.com/{i}", "queued")
+        journal.add(j)
+        j.state = "done"
+        journal.update(j)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if os.path.exists(journal.path) and os.path.getsize(journal.path) == 0:
+            break                    # the writer thread compacted on its own
+        time.sleep(0.01)
+    else:
+        raise AssertionError("journal was never compacted")
+
+
+def test_adopts_only_ended_sessions(tmp_path):
+    # A session that died with one job running and one done, and never locked
+    dead = tmp_path / "20250101-000000-1-abcdef.jsonl"
+    left, finished = job("https://example.com/left", "running"), job("https://example.com/ok", "done")
+    dead.write_text("".join(json.dumps({"uid": j.uid, "state": j.state, "spec": j.spec()}) + "\n"
+                            for j in (left, finished)), encoding="utf-8")
+    (tmp_path / "20250101-000000-2-abcdef.jsonl.lock").write_text("")   # never wrote a job
+    # Another process running right now
+    live = JobJournal(str(tmp_path))
+    busy = job("https://example.com/busy", "running")
+    live.add(busy)
+    live.flush()
+
+    journal = JobJournal(str(tmp_path))
+    assert set(journal.adopt()) == {left.uid}
+    assert set(journal.replay()) == {left.uid}          # now ours
+    assert not dead.exists()
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(p) for j in (live, journal) for p in (j.path, j.path + ".lock"))
+    assert journal.adopt() == {}                        # the live one stays its own
+    assert set(live.replay()) == {busy.uid}
@@ -0,0 +1,143 @@
+"""SegmentedHttpFD against the local media server of the benchmarks."""
+
+import json
+import os
+import threading
+
+import pytest
+import yt_dlp
+
+from benchmarks.media_server import MediaHandler, MediaServer
+from novastream_ytdl import NovaYoutubeDL, SegmentedHttpFD
+
+SIZE = 4 * SegmentedHttpFD.MIN_SEGMENT + 12345      # 4 ranges, uneven last one
+
+
+@pytest.fixture
+def server():
+    srv = MediaServer().start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def download(url: str, filename: str, connections: int = 4) -> bool:
+    ydl = NovaYoutubeDL({"quiet": True, "noprogress": True, "retries": 0,
+                         "segmented_connections": connections})
+    with ydl:
+        fd = SegmentedHttpFD(ydl, ydl.params)
+        return fd.download(filename, {"url": url, "http_headers": {}})
+
+
+def gets(srv: MediaServer, path: str) -> list:
+    return [rng for method, p, rng in srv.requests if method == "GET" and p == path]
+
+
+def test_fresh_download(server, tmp_path):
+    url  = server.add_file("fresh", SIZE)
+    data = server.media["/fresh.mp4"][0]
+    out  = str(tmp_path / "fresh.mp4")
+    assert download(url, out)
+    with open(out, "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(out + ".part.ranges")
+    step = SIZE // 4
+    expected = ["bytes=0-0"] + [f"bytes={i * step}-{SIZE - 1 if i == 3 else (i + 1) * step - 1}"
+                                for i in range(4)]
+    assert sorted(gets(server, "/fresh.mp4")) == sorted(expected)   # one request per range
+
+
+def test_resume_from_sidecar(server, tmp_path):
+    url  = server.add_file("resume", SIZE)
+    data = server.media["/resume.mp4"][0]
+    out  = str(tmp_path / "resume.mp4")
+    step = SIZE // 4
+    ranges = [[i * step, SIZE - 1 if i == 3 else (i + 1) * step - 1] for i in range(4)]
+    # An interrupted run: each range got part of the way, the rest is zeros
+    part = bytearray(SIZE)
+    for i, (start, end) in enumerate(ranges):
+        got = (end - start + 1) * i // 4            # 0, ¼, ½, ¾ of the range
+        part[start:start + got] = data[start:start + got]
+        ranges[i][0] = start + got
+    with open(out + ".part", "wb") as f:
+        f.write(part)
+    with open(out + ".part.ranges", "w", encoding="utf-8") as f:
+        json.dump({"size": SIZE, "ranges": ranges}, f)
+
+    assert download(url, out)
+    with open(out, "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(out + ".part.ranges")
+    # No size probe, and every range continues from its checkpoint
+    assert sorted(gets(server, "/resume.mp4")) == sorted(
+        f"bytes={start}-{end}" for start, end in ranges)
+
+
+def test_no_range_fallback(tmp_path):
+    srv = MediaServer(ranges=False).start()
+    try:
+        url  = srv.add_file("plain", SIZE)
+        data = srv.media["/plain.mp4"][0]
+        out  = str(tmp_path / "plain.mp4")
+        assert download(url, out)
+        with open(out, "rb") as f:
+            assert f.read() == data
+        assert not os.path.exists(out + ".part.ranges")
+        # The probe is answered with 200, then one plain single-stream GET
+        requests = gets(srv, "/plain.mp4")
+        assert requests[0] == "bytes=0-0"
+        assert len(requests) == 2
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_small_file_is_not_split(server, tmp_path):
+    url = server.add_file("small", SegmentedHttpFD.MIN_SEGMENT)
+    out = str(tmp_path / "small.mp4")
+    assert download(url, out)
+    with open(out, "rb") as f:
+        assert f.read() == server.media["/small.mp4"][0]
+    assert len(gets(server, "/small.mp4")) == 2    # probe + one stream
+
+
+def test_preallocated_part_without_sidecar_restarts(server, tmp_path):
+    url  = server.add_file("orphan", SIZE)
+    data = server.media["/orphan.mp4"][0]
+    out  = str(tmp_path / "orphan.mp4")
+    with open(out + ".part", "wb") as f:      # died between preallocate and checkpoint
+        f.truncate(SIZE)
+    assert download(url, out)
+    with open(out, "rb") as f:
+        assert f.read() == data
+    assert len(gets(server, "/orphan.mp4")) == 5    # probe + 4 fresh ranges
+
+
+class TruncatingHandler(MediaHandler):
+    """Hangs up halfway through every range longer than a byte."""
+
+    def _send(self, data, pos: int, stop: int):
+        if stop - pos > 1:
+            stop = pos + (stop - pos) // 2
+            self.close_connection = True
+        super()._send(data, pos, stop)
+
+
+def test_truncated_ranges_use_up_retries(server, tmp_path):
+    server.RequestHandlerClass = TruncatingHandler
+    url    = server.add_file("short", SIZE)
+    result = []
+
+    def run():
+        try:
+            result.append(download(url, str(tmp_path / "short.mp4")))
+        except yt_dlp.utils.DownloadError as e:
+            result.append(e)
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    t.join(30)
+    assert not t.is_alive(), "a truncating server kept the download looping"
+    assert isinstance(result[0], yt_dlp.utils.DownloadError)
+    requests = gets(server, "/short.mp4")
+    assert len(requests) == len(set(requests))      # retries=0: no range asked twice